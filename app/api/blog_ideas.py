@@ -1,38 +1,72 @@
+import asyncio
 import json
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+import os
+from datetime import datetime
+from html import escape
 
-from app.data import get_clients, get_blog_ideas, get_blog_idea_html as get_blog_idea_html_data, get_blog_post_artifact
-from app.schemas.models import BlogIdeaRead, BlogIdeaUpdate, BlogPostArtifactRead
-from app.utils import create_sse_stream, delay_response, get_current_timestamp
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+
+from app.artifacts import get_artifact_index
+from app.cache import cached_json_response
+from app.data import get_blog_idea_html as get_blog_idea_html_data
+from app.events import SSE_HEADERS, get_event_bus
+from app.jobs import QUEUED, QueueFull, get_blog_idea_queue
+from app.repository import get_repository
+from app.responses import ArtifactFileResponse, not_modified_response
+from app.schemas.models import (
+    BlogIdeaJobRead,
+    BlogIdeaRead,
+    BlogIdeaUpdate,
+    BlogPostArtifactRead,
+    ChangeSet,
+)
+from app.sync import changes_json_response
+from app.utils import delay_response, get_current_timestamp
 
 router = APIRouter()
 
+_blog_ideas_adapter = TypeAdapter(list[BlogIdeaRead])
+
+
+@router.get("", response_model=list[BlogIdeaRead] | ChangeSet[BlogIdeaRead])
+async def list_blog_ideas(
+    request: Request, client_id: int, since: datetime | None = None
+):
+    """List all blog ideas for a client.
 
-@router.get("", response_model=list[BlogIdeaRead])
-async def list_blog_ideas(client_id: int):
-    """List all blog ideas for a client."""
+    With ``since``, return only the blog ideas changed or deleted after it.
+    """
     # Check if client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
 
-    return get_blog_ideas(client_id)
+    if since is not None:
+        return await changes_json_response(
+            request, "blog_ideas", client_id, since, BlogIdeaRead
+        )
+
+    return cached_json_response(
+        request,
+        "blog_ideas",
+        client_id,
+        lambda: _blog_ideas_adapter.dump_json(repo.list_blog_ideas(client_id)),
+    )
 
 
 @router.post("/generate", response_model=list[BlogIdeaRead])
 async def generate_blog_ideas(client_id: int):
     """Generate blog ideas from keyword sets (stub, wait 5s)."""
     # Check if client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
 
     await delay_response(5)
     
-    return get_blog_ideas(client_id)
+    return repo.list_blog_ideas(client_id)
 
 
 @router.put("/{blog_idea_id}", response_model=BlogIdeaRead)
@@ -41,16 +75,14 @@ async def update_blog_idea(
     blog_idea_id: int,
     blog_idea_update: BlogIdeaUpdate,
 ):
-    """Update a blog idea (stub)."""
+    """Update a blog idea."""
     # Check if client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
 
     # Verify the blog idea belongs to the client
-    blog_ideas = get_blog_ideas(client_id)
-    blog_idea = next((b for b in blog_ideas if b.id == blog_idea_id), None)
+    blog_idea = repo.get_blog_idea(client_id, blog_idea_id)
     if not blog_idea:
         raise HTTPException(status_code=404, detail="Blog idea not found")
 
@@ -59,182 +91,295 @@ async def update_blog_idea(
     blog_idea_dict = blog_idea.model_dump()
     blog_idea_dict.update(update_data)
     blog_idea_dict["updated_at"] = get_current_timestamp()
-    
-    return BlogIdeaRead(**blog_idea_dict)
 
+    return await repo.save("blog_ideas", BlogIdeaRead(**blog_idea_dict))
 
-@router.post("/{blog_idea_id}/queue", response_model=BlogIdeaRead)
+
+async def _enqueue(blog_idea: BlogIdeaRead) -> BlogIdeaJobRead:
+    try:
+        job = await get_blog_idea_queue().enqueue(blog_idea)
+    except QueueFull:
+        raise HTTPException(status_code=503, detail="Blog idea queue is full")
+    return job.read()
+
+
+@router.post(
+    "/{blog_idea_id}/queue", response_model=BlogIdeaJobRead, status_code=202
+)
 async def queue_blog_idea(
     client_id: int, blog_idea_id: int
 ):
-    """Queue a blog idea for processing (stub)."""
+    """Queue a blog idea for processing.
+
+    Returns the job at once; its state, also stored on the blog idea, goes
+    from ``queued`` to ``in_progress`` to ``complete`` or ``error``.
+    Queueing an idea that is already queued returns its current job.
+    """
     # Check if client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
 
     # Verify the blog idea belongs to the client
-    blog_ideas = get_blog_ideas(client_id)
-    blog_idea = next((b for b in blog_ideas if b.id == blog_idea_id), None)
+    blog_idea = repo.get_blog_idea(client_id, blog_idea_id)
     if not blog_idea:
         raise HTTPException(status_code=404, detail="Blog idea not found")
 
-    # Update state to queued
-    blog_idea_dict = blog_idea.model_dump()
-    blog_idea_dict["state"] = "queued"
-    blog_idea_dict["updated_at"] = get_current_timestamp()
-    
-    return BlogIdeaRead(**blog_idea_dict)
+    return await _enqueue(blog_idea)
 
 
-@router.post("/process-queued")
+@router.post(
+    "/process-queued", response_model=list[BlogIdeaJobRead], status_code=202
+)
 async def process_queued_blog_ideas(
     client_id: int
 ):
-    """Move all queued blog ideas directly to 'complete' state (stub, wait 5s)."""
+    """Make sure every queued blog idea of the client has a job, and
+    return the jobs without waiting for them."""
     # Check if client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
 
-    # Simulate processing delay
-    await delay_response(5)
+    blog_ideas = repo.list_blog_ideas(client_id)
+    return [await _enqueue(b) for b in blog_ideas if b.state == QUEUED]
 
-    # Get queued blog ideas
-    blog_ideas = get_blog_ideas(client_id)
-    queued_ideas = [b for b in blog_ideas if b.state == "queued"]
 
-    results = []
-    for blog_idea in queued_ideas:
-        results.append({
-            "blog_idea_id": blog_idea.id,
-            "state": "complete",
-        })
+@router.get("/jobs/{job_id}", response_model=BlogIdeaJobRead)
+async def get_blog_idea_job(
+    request: Request, response: Response, client_id: int, job_id: str
+):
+    """Get the state of a blog idea processing job."""
+    job = get_blog_idea_queue().get(job_id)
+    if not job or job.client_id != client_id:
+        raise HTTPException(status_code=404, detail="Job not found")
 
-    return results
+    # A job only changes by moving to another state or finishing a stage
+    etag = f'"{job.id}-{job.state}-{len(job.stages)}"'
+    not_modified = not_modified_response(request.headers, etag)
+    if not_modified:
+        return not_modified
+    response.headers["ETag"] = etag
+    return job.read()
 
 
 @router.get("/{blog_idea_id}/process-stream")
 async def stream_blog_idea_processing(
     client_id: int,
     blog_idea_id: int,
+    last_event_id: str | None = Header(None),
 ):
-    """Stream progress events for processing a single blog idea (stub)."""
+    """Stream progress events of the job processing a blog idea.
+
+    Events are published by the queue worker as the job advances; the
+    stream ends with a ``complete`` or ``error`` event. Any number of
+    clients can follow the same blog idea. A client reconnecting with
+    ``Last-Event-ID`` is first sent the events it missed, even if the job
+    has finished since.
+    """
     # Verify client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
     
     # Verify blog idea exists and belongs to client
-    blog_ideas = get_blog_ideas(client_id)
-    blog_idea = next((b for b in blog_ideas if b.id == blog_idea_id), None)
+    blog_idea = repo.get_blog_idea(client_id, blog_idea_id)
     if not blog_idea:
         raise HTTPException(status_code=404, detail="Blog idea not found")
     
-    # Verify blog idea is in progress
-    if blog_idea.state != "in_progress":
+    # Subscribe before checking the state, so no event is missed between
+    # the check and the subscription
+    subscription = get_event_bus().subscribe(
+        (client_id, blog_idea_id), last_event_id
+    )
+    job = get_blog_idea_queue().active_job(client_id, blog_idea_id)
+    if job is None and not subscription.ended:
+        subscription.close()
         raise HTTPException(
             status_code=400,
-            detail=f"Blog idea is in '{blog_idea.state}' state, must be 'in_progress' to stream processing"
+            detail=f"Blog idea is in '{blog_idea.state}' state, must be 'queued' or 'in_progress' to stream processing"
         )
-    
-    # Create progress messages
-    progress_messages = [
-        "Initializing blog post generation...",
-        "Creating content brief...",
-        "Generating initial draft...",
-        "Optimizing for SEO...",
-        "Finalizing blog post...",
-    ]
-    
-    # Prepare final data
-    final_data = {
-        "blog_idea_id": blog_idea_id,
-        "state": "complete",
-        "final_version_number": 1,
-    }
-    
+
     async def event_generator():
-        async for event in create_sse_stream(progress_messages, final_data):
-            yield event
+        try:
+            async for event in subscription:
+                yield event.message
+        finally:
+            subscription.close()
     
     return StreamingResponse(
         event_generator(),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        },
+        headers=SSE_HEADERS,
     )
 
 
 @router.get("/{blog_idea_id}/html")
 async def get_blog_idea_html(
+    request: Request,
+    response: Response,
     client_id: int,
     blog_idea_id: int,
     version_number: int | None = None,
+    latest: bool = False,
 ):
-    """Get HTML for a blog idea."""
+    """Get HTML for a blog idea.
+
+    Pass ``latest=true`` to get the newest available version instead of
+    ``version_number`` (which defaults to 1).
+    """
     # Verify client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
-    
+
     # Verify blog idea exists and belongs to client
-    blog_ideas = get_blog_ideas(client_id)
-    blog_idea = next((b for b in blog_ideas if b.id == blog_idea_id), None)
+    blog_idea = repo.get_blog_idea(client_id, blog_idea_id)
     if not blog_idea:
         raise HTTPException(status_code=404, detail="Blog idea not found")
-    
-    # Get HTML (pass client_id to help identify which client this belongs to)
-    html_data = get_blog_idea_html_data(blog_idea_id, version_number, client_id)
+
+    if latest and version_number is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="version_number and latest cannot be combined",
+        )
+
+    # The artifact file's version, mtime and size are its version stamp
+    artifact_stamp = ""
+    resolved = get_artifact_index().resolve(
+        client_id, blog_idea_id, version_number, latest=latest
+    )
+    if resolved:
+        try:
+            stat_result = await asyncio.to_thread(os.stat, resolved[1])
+            artifact_stamp = "{}-{:x}-{:x}".format(
+                resolved[0], stat_result.st_mtime_ns, stat_result.st_size
+            )
+        except FileNotFoundError:
+            pass
+    etag = repo.etag(("blog_ideas", client_id), extra=artifact_stamp)
+    not_modified = not_modified_response(request.headers, etag)
+    if not_modified:
+        return not_modified
+    response.headers["ETag"] = etag
+
+    html_data = await asyncio.to_thread(
+        get_blog_idea_html_data,
+        client_id,
+        blog_idea_id,
+        version_number,
+        latest=latest,
+    )
+    if not html_data and not get_artifact_index().has_artifacts(
+        client_id, blog_idea_id
+    ):
+        # No file generated yet: serve a placeholder for this blog idea
+        return {
+            "blog_idea_id": blog_idea_id,
+            "version_number": version_number or 1,
+            "html": f"<h1>{escape(blog_idea.topic)}</h1><p>Demo HTML content...</p>",
+        }
     if not html_data:
         raise HTTPException(
             status_code=404,
             detail="HTML artifact not found for this blog idea",
         )
-    
+
     return html_data
 
 
+@router.api_route("/{blog_idea_id}/html/raw", methods=["GET", "HEAD"])
+async def get_blog_idea_html_raw(
+    request: Request,
+    client_id: int,
+    blog_idea_id: int,
+    version_number: int | None = None,
+    latest: bool = False,
+):
+    """Serve the HTML artifact file for a blog idea directly as text/html.
+
+    Supports Range, If-Range, If-None-Match and If-Modified-Since.
+    """
+    # Verify client exists
+    repo = get_repository()
+    if not repo.get_client(client_id):
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    # Verify blog idea exists and belongs to client
+    if not repo.get_blog_idea(client_id, blog_idea_id):
+        raise HTTPException(status_code=404, detail="Blog idea not found")
+
+    if latest and version_number is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="version_number and latest cannot be combined",
+        )
+
+    resolved = get_artifact_index().resolve(
+        client_id, blog_idea_id, version_number, latest=latest
+    )
+    if resolved is None:
+        raise HTTPException(
+            status_code=404,
+            detail="HTML artifact not found for this blog idea",
+        )
+    version, html_file = resolved
+    try:
+        stat_result = await asyncio.to_thread(os.stat, html_file)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail="HTML artifact not found for this blog idea",
+        )
+
+    return ArtifactFileResponse(
+        html_file,
+        stat_result,
+        request.headers,
+        headers={"X-Artifact-Version": str(version)},
+    )
+
+
 @router.delete("/{blog_idea_id}", status_code=204)
 async def delete_blog_idea(
     client_id: int, blog_idea_id: int
 ):
-    """Delete a blog idea (stub)."""
+    """Delete a blog idea."""
     # Check if client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
     
     # Verify the blog idea belongs to the client
-    blog_ideas = get_blog_ideas(client_id)
-    blog_idea = next((b for b in blog_ideas if b.id == blog_idea_id), None)
+    blog_idea = repo.get_blog_idea(client_id, blog_idea_id)
     if not blog_idea:
         raise HTTPException(status_code=404, detail="Blog idea not found")
-    
+
+    await repo.delete("blog_ideas", client_id, blog_idea_id)
     return None
 
 
 @router.get("/{blog_idea_id}/debug")
 async def debug_blog_idea(
-    client_id: int, blog_idea_id: int
+    request: Request, response: Response, client_id: int, blog_idea_id: int
 ):
     """Debug endpoint to inspect the ABS state for a single blog idea."""
     # Query for the BlogIdea
-    blog_ideas = get_blog_ideas(client_id)
-    blog_idea = next((b for b in blog_ideas if b.id == blog_idea_id), None)
+    repo = get_repository()
+    blog_idea = repo.get_blog_idea(client_id, blog_idea_id)
     if not blog_idea:
         raise HTTPException(status_code=404, detail="BlogIdea not found")
 
+    etag = repo.etag(
+        ("blog_ideas", client_id), ("blog_post_artifacts", client_id)
+    )
+    not_modified = not_modified_response(request.headers, etag)
+    if not_modified:
+        return not_modified
+    response.headers["ETag"] = etag
+
     # Load associated BlogPostArtifact if any
-    final_post = get_blog_post_artifact(blog_idea_id)
+    final_post = repo.get_blog_post_artifact_for_idea(client_id, blog_idea_id)
 
     return {
         "blog_idea": blog_idea.model_dump(),
@@ -1,27 +1,41 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 
-from app.data import get_blog_post_artifact
+from app.repository import get_repository
+from app.responses import not_modified_response
 from app.schemas.models import BlogPostArtifactRead
 
 router = APIRouter()
 
 
 @router.get("/{blog_post_id}", response_model=BlogPostArtifactRead)
-async def get_blog_post(blog_post_id: int):
+async def get_blog_post(request: Request, response: Response, blog_post_id: int):
     """Get a blog post artifact by ID."""
-    blog_post = get_blog_post_artifact(blog_post_id)
+    repo = get_repository()
+    blog_post = repo.get_blog_post_artifact(blog_post_id)
     if not blog_post:
         raise HTTPException(status_code=404, detail="Blog post not found")
+
+    etag = repo.etag(("blog_post_artifacts", blog_post.client_id))
+    not_modified = not_modified_response(request.headers, etag)
+    if not_modified:
+        return not_modified
+    response.headers["ETag"] = etag
     return blog_post
 
 
 @router.get("/{blog_post_id}/xml")
-async def get_blog_post_xml(blog_post_id: int):
+async def get_blog_post_xml(request: Request, response: Response, blog_post_id: int):
     """Get the XML content of a blog post artifact."""
-    blog_post = get_blog_post_artifact(blog_post_id)
+    repo = get_repository()
+    blog_post = repo.get_blog_post_artifact(blog_post_id)
     if not blog_post:
         raise HTTPException(status_code=404, detail="Blog post not found")
 
+    etag = repo.etag(("blog_post_artifacts", blog_post.client_id))
+    not_modified = not_modified_response(request.headers, etag)
+    if not_modified:
+        return not_modified
+    response.headers["ETag"] = etag
+
     xml_content = blog_post.xml if blog_post.xml else "<!-- XML not available -->"
     return {"xml": xml_content}
-
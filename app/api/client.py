@@ -1,62 +1,77 @@
-from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from pydantic import BaseModel, TypeAdapter
 
-from app.data import get_clients
+from app.cache import cached_json_response
+from app.repository import get_repository
+from app.responses import not_modified_response
 from app.schemas.models import ClientCreate, ClientRead, ClientUpdate
 from app.utils import get_current_timestamp
 
 router = APIRouter()
 
+_clients_adapter = TypeAdapter(list[ClientRead])
+
 
 class RenameClientRequest(BaseModel):
     name: str
 
 
 @router.get("", response_model=list[ClientRead])
-async def list_clients():
+async def list_clients(request: Request):
     """List all clients."""
-    return get_clients()
+    return cached_json_response(
+        request,
+        "clients",
+        None,
+        lambda: _clients_adapter.dump_json(get_repository().list_clients()),
+    )
 
 
 @router.post("", response_model=ClientRead, status_code=status.HTTP_201_CREATED)
 async def create_client(client: ClientCreate):
-    """Create a new client (stub)."""
-    clients = get_clients()
-    max_id = max(c.id for c in clients) if clients else 0
+    """Create a new client."""
+    repo = get_repository()
     now = get_current_timestamp()
-    return ClientRead(
-        id=max_id + 1,
+    new_client = ClientRead(
+        id=repo.allocate_id("clients"),
         name=client.name,
         slug=client.slug,
         notes=None,
         created_at=now,
         updated_at=now,
     )
+    return await repo.save("clients", new_client)
 
 
 @router.get("/{client_id}", response_model=ClientRead)
-async def get_client(client_id: int):
+async def get_client(request: Request, response: Response, client_id: int):
     """Get a single client by ID."""
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
+    repo = get_repository()
+    client = repo.get_client(client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
+
+    etag = repo.etag(("clients", client_id))
+    not_modified = not_modified_response(request.headers, etag)
+    if not_modified:
+        return not_modified
+    response.headers["ETag"] = etag
     return client
 
 
 @router.patch("/{client_id}/rename", response_model=ClientRead)
 async def rename_client(client_id: int, request: RenameClientRequest):
-    """Rename a client (stub)."""
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
+    """Rename a client."""
+    repo = get_repository()
+    client = repo.get_client(client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
-    
+
     if not request.name or not request.name.strip():
         raise HTTPException(status_code=400, detail="Client name cannot be empty")
-    
-    # Return updated client
-    return ClientRead(
+
+    # Store updated client
+    updated = ClientRead(
         id=client.id,
         name=request.name.strip(),
         slug=client.slug,
@@ -64,19 +79,20 @@ async def rename_client(client_id: int, request: RenameClientRequest):
         created_at=client.created_at,
         updated_at=get_current_timestamp(),
     )
+    return await repo.save("clients", updated)
 
 
 @router.put("/{client_id}", response_model=ClientRead)
 async def update_client(client_id: int, client_update: ClientUpdate):
-    """Update a client (stub)."""
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
+    """Update a client."""
+    repo = get_repository()
+    client = repo.get_client(client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
-    
+
     # Merge updates
     update_data = client_update.model_dump(exclude_unset=True)
-    return ClientRead(
+    updated = ClientRead(
         id=client.id,
         name=update_data.get("name", client.name),
         slug=update_data.get("slug", client.slug),
@@ -84,14 +100,15 @@ async def update_client(client_id: int, client_update: ClientUpdate):
         created_at=client.created_at,
         updated_at=get_current_timestamp(),
     )
+    return await repo.save("clients", updated)
 
 
 @router.delete("/{client_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_client(client_id: int):
-    """Delete a client (stub)."""
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
+    """Delete a client and all of its data."""
+    repo = get_repository()
+    client = repo.get_client(client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
+    await repo.delete_client(client_id)
     return None
-
@@ -1,12 +1,13 @@
 import json
 from datetime import datetime
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Header, HTTPException, Request, Response
 from pydantic import BaseModel
 
-from app.data import get_clients, get_client_context as get_client_context_data
+from app.events import get_resumable_streams
+from app.repository import get_repository
+from app.responses import not_modified_response
 from app.schemas.models import ClientContextRead, ClientContextUpdate
-from app.utils import create_sse_stream, delay_response
+from app.utils import create_sse_stream, delay_response, get_current_timestamp
 
 router = APIRouter()
 
@@ -16,17 +17,22 @@ class FetchRequest(BaseModel):
 
 
 @router.get("", response_model=ClientContextRead)
-async def get_client_context(client_id: int):
+async def get_client_context(request: Request, response: Response, client_id: int):
     """Get the client context for a given client."""
     # Check if client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
     
-    context = get_client_context_data(client_id)
+    context = repo.get_client_context(client_id)
     if not context:
         raise HTTPException(status_code=404, detail="Client context not found")
+
+    etag = repo.etag(("client_contexts", client_id))
+    not_modified = not_modified_response(request.headers, etag)
+    if not_modified:
+        return not_modified
+    response.headers["ETag"] = etag
     return context
 
 
@@ -35,22 +41,20 @@ async def upsert_client_context(
     client_id: int,
     context_update: ClientContextUpdate,
 ):
-    """Create or update the client context (stub)."""
+    """Create or update the client context."""
     # Check if client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
 
     # Get existing context or create new
-    context = get_client_context_data(client_id)
+    context = repo.get_client_context(client_id)
     if not context:
         # Create new context
         if not context_update.domain:
             raise HTTPException(
                 status_code=400, detail="domain is required for new context"
             )
-        from app.utils import get_current_timestamp
         now = get_current_timestamp()
         context = ClientContextRead(
             id=client_id,
@@ -81,8 +85,9 @@ async def upsert_client_context(
     update_data = context_update.model_dump(exclude_unset=True)
     context_dict = context.model_dump()
     context_dict.update(update_data)
-    
-    return ClientContextRead(**context_dict)
+    context_dict["updated_at"] = get_current_timestamp()
+
+    return await repo.save("client_contexts", ClientContextRead(**context_dict))
 
 
 @router.post("/fetch", response_model=ClientContextRead)
@@ -91,14 +96,13 @@ async def fetch_client_context(
 ):
     """Fetch and build client context (stub, wait 5s)."""
     # Check if client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
     
     await delay_response(5)
     
-    context = get_client_context_data(client_id)
+    context = repo.get_client_context(client_id)
     if not context:
         raise HTTPException(status_code=404, detail="Client context not found")
     return context
@@ -106,17 +110,27 @@ async def fetch_client_context(
 
 @router.post("/fetch-stream")
 async def fetch_client_context_stream(
-    client_id: int, request: FetchRequest | None = None
+    client_id: int,
+    request: FetchRequest | None = None,
+    last_event_id: str | None = Header(None),
 ):
-    """Fetch and build client context with SSE progress updates (stub)."""
+    """Fetch and build client context with SSE progress updates (stub).
+
+    A client reconnecting with ``Last-Event-ID`` continues the same stream
+    from the event after it.
+    """
     try:
         # Check if client exists
-        clients = get_clients()
-        client = next((c for c in clients if c.id == client_id), None)
-        if not client:
+        repo = get_repository()
+        if not repo.get_client(client_id):
             raise HTTPException(status_code=404, detail="Client not found")
         
-        context = get_client_context_data(client_id)
+        streams = get_resumable_streams()
+        resumed = streams.resume(("fetch-stream", client_id), last_event_id)
+        if resumed is not None:
+            return resumed
+        
+        context = repo.get_client_context(client_id)
         if not context:
             raise HTTPException(status_code=404, detail="Client context not found")
         
@@ -140,18 +154,9 @@ async def fetch_client_context_stream(
                 if key in context_dict and isinstance(context_dict[key], datetime):
                     context_dict[key] = context_dict[key].isoformat()
         
-        async def event_generator():
-            async for event in create_sse_stream(progress_messages, context_dict):
-                yield event
-        
-        return StreamingResponse(
-            event_generator(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no",
-            },
+        return streams.response(
+            ("fetch-stream", client_id),
+            create_sse_stream(progress_messages, context_dict),
         )
     except HTTPException:
         raise
@@ -1,29 +1,77 @@
+import asyncio
 import json
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from typing import Literal
+
+import numpy as np
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-
-from app.data import (
-    get_clients,
-    get_keyword_ideas,
-    get_keyword_clusters,
-    get_keyword_sets,
-    get_best_alternates,
+from pydantic import BaseModel, TypeAdapter
+
+from app.autocomplete import MAX_SUGGESTIONS, get_prefix_search
+from app.cache import cached_json_response
+from app.columns import SortedColumnsView
+from app.config import get_settings
+from app.clustering import collapse_near_duplicates, get_clustering_service
+from app.indexes import (
+    InvalidCursor,
+    SortedIndex,
+    decode_cursor,
+    encode_cursor,
 )
+from app.keyword_sets import develop_keyword_sets
+from app.events import get_resumable_streams
+from app.metrics import get_metrics_provider
+from app.repository import get_repository
+from app.responses import not_modified_response
+from app.scoring import top_positions
 from app.schemas.models import (
     KeywordIdeaRead,
     KeywordClusterRead,
+    KeywordSuggestionRead,
+    ScoredKeywordIdeaRead,
     KeywordSetRead,
     BestAlternateRead,
+    ChangeSet,
+    Page,
+)
+from app.similarity import (
+    DEFAULT_LIMIT_PER_SEED,
+    DEFAULT_SIM_THRESHOLD,
+    get_similarity_index,
+    pick_best_alternate,
+)
+from app.sync import changes_json_response
+from app.utils import (
+    create_ndjson_stream,
+    create_sse_stream,
+    get_current_timestamp,
 )
-from app.utils import create_sse_stream, delay_response
 
 router = APIRouter()
 
+_ideas_adapter = TypeAdapter(list[KeywordIdeaRead])
+_scored_adapter = TypeAdapter(list[ScoredKeywordIdeaRead])
+_clusters_adapter = TypeAdapter(list[KeywordClusterRead])
+_sets_adapter = TypeAdapter(list[KeywordSetRead])
+_best_alternates_adapter = TypeAdapter(list[BestAlternateRead])
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+SortOrder = Literal["volume", "keyword"]
+StreamFormat = Literal["sse", "ndjson"]
+
+# Fields reported for keywords merged into a near-duplicate representative
+_VARIANT_FIELDS = {"id", "keyword", "search_volume", "keyword_difficulty"}
+
 
 class GenerateIdeasRequest(BaseModel):
     min_sv: int | None = None
     max_kd: int | None = None
+    # Opt-in: it needs every idea before the first batch. It only changes
+    # the response; the stored ideas are not deduplicated
+    collapse_duplicates: bool = False
 
 
 class BestAlternateRequest(BaseModel):
@@ -32,24 +80,107 @@ class BestAlternateRequest(BaseModel):
     limit_per_seed: int | None = None
 
 
+class BestAlternateBatchRequest(BaseModel):
+    keyword_ids: list[int]
+    sim_threshold: float | None = None
+    limit_per_seed: int | None = None
+
+
 class DevelopSetsRequest(BaseModel):
     keyword_ids: list[int]
     min_sv: int | None = None
 
 
+def _matches_metrics(
+    idea: KeywordIdeaRead, min_sv: int | None, max_kd: int | None
+) -> bool:
+    """The metric filters of ``KeywordColumns.select``, applied to a model:
+    nulls never match a filter."""
+    if min_sv is not None and (
+        idea.search_volume is None or idea.search_volume < min_sv
+    ):
+        return False
+    if max_kd is not None and (
+        idea.keyword_difficulty is None or idea.keyword_difficulty > max_kd
+    ):
+        return False
+    return True
+
+
+def _check_not_paged(cursor: str | None, limit: int | None) -> None:
+    if cursor is not None or limit is not None:
+        raise HTTPException(
+            status_code=400, detail="since cannot be combined with cursor or limit"
+        )
+
+
+def _paged_response(
+    request: Request,
+    table: str,
+    client_id: int,
+    model: type[BaseModel],
+    order: str,
+    cursor: str | None,
+    limit: int | None,
+    index: SortedIndex | SortedColumnsView | None = None,
+):
+    """Serve one keyset page of ``index`` (default: the whole table sorted
+    by ``order``)."""
+    if index is None:
+        index = get_repository().sorted_index(table, client_id, order)
+    after = None
+    if cursor is not None and len(index):
+        try:
+            after = decode_cursor(cursor, order, index.template)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    def build() -> bytes:
+        rows, next_key = index.page(after, limit or DEFAULT_PAGE_SIZE)
+        next_cursor = encode_cursor(order, next_key) if next_key else None
+        return Page[model](items=rows, next_cursor=next_cursor).model_dump_json()
+
+    return cached_json_response(request, table, client_id, build)
+
+
 @router.post("/generate-ideas")
 async def generate_ideas(
     client_id: int,
     request: GenerateIdeasRequest | None = None,
+    stream_format: StreamFormat = Query("sse", alias="format"),
+    last_event_id: str | None = Header(None),
 ):
-    """Generate keyword ideas with SSE progress updates (stub)."""
+    """Stream the client's keyword ideas with SSE progress updates.
+
+    Ideas are sent in ``batch`` events of at most ``STREAM_BATCH_SIZE``
+    ideas, followed by a ``complete`` event with the totals; only one
+    batch is built at a time. With ``format=ndjson`` the ideas are
+    streamed one JSON object per line, without progress messages. With
+    ``collapse_duplicates`` (off by default), near-duplicate keywords are
+    merged into their highest-volume variant; that groups every idea
+    before the first batch is sent. Only the response is collapsed: the
+    stored ideas, which clustering, develop-sets and best-alternate work
+    from, keep every variant. Search volume and difficulty come from the metrics provider,
+    and ``min_sv`` and ``max_kd`` filter on those numbers, as in
+    develop-sets.
+    A client reconnecting to the SSE stream with ``Last-Event-ID`` is sent
+    the events after it, without the ideas being generated again.
+    """
     # Check if client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
     
-    ideas = get_keyword_ideas(client_id)
+    streams = get_resumable_streams()
+    if stream_format == "sse":
+        resumed = streams.resume(("generate-ideas", client_id), last_event_id)
+        if resumed is not None:
+            return resumed
+    
+    if request is None:
+        request = GenerateIdeasRequest()
+    view = repo.filter_keyword_ideas(client_id)
+    batch_size = get_settings().STREAM_BATCH_SIZE
     
     # Create progress messages
     progress_messages = [
@@ -60,96 +191,394 @@ async def generate_ideas(
         "Finalizing keyword ideas...",
     ]
     
-    # Prepare final data
-    final_data = [idea.model_dump(mode='json') for idea in ideas]
+    # Prepare the batches; ideas are only built when their batch is sent.
+    # Metrics come from the metrics provider, and are what the filters
+    # check.
+    metrics = get_metrics_provider()
+    
+    async def current(ideas: list[KeywordIdeaRead]) -> list[KeywordIdeaRead]:
+        return [
+            idea
+            for idea in await metrics.apply(ideas)
+            if _matches_metrics(idea, request.min_sv, request.max_kd)
+        ]
+    
+    if request.collapse_duplicates:
+        # Keep the highest-volume variant of each near-duplicate group and
+        # list the variants merged into it
+        pool = await current(view.rows)
+        groups = await asyncio.to_thread(collapse_near_duplicates, pool)
+        merged = sum(len(g.variants) for g in groups)
+        progress_messages.insert(
+            -1, f"Collapsed {merged} near-duplicate keywords..."
+        )
+        
+        async def batches():
+            for start in range(0, len(groups), batch_size):
+                yield [
+                    {
+                        **g.representative.model_dump(mode="json"),
+                        "variants": [
+                            v.model_dump(mode="json", include=_VARIANT_FIELDS)
+                            for v in g.variants
+                        ],
+                    }
+                    for g in groups[start : start + batch_size]
+                ]
+    else:
+        
+        async def batches():
+            for batch in view.batches(batch_size):
+                ideas = await current(batch)
+                if ideas:
+                    yield [idea.model_dump(mode="json") for idea in ideas]
+    
+    if stream_format == "ndjson":
+        return StreamingResponse(
+            create_ndjson_stream(batches()),
+            media_type="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    
+    # Filled in while the batches are sent, read by the completion event
+    summary = {"total": 0, "batches": 0}
     
-    async def event_generator():
-        async for event in create_sse_stream(progress_messages, final_data):
-            yield event
+    async def counted():
+        async for batch in batches():
+            summary["total"] += len(batch)
+            summary["batches"] += 1
+            yield batch
     
-    return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        },
+    return streams.response(
+        ("generate-ideas", client_id),
+        create_sse_stream(progress_messages, summary, batches=counted())
     )
 
 
-@router.get("/ideas", response_model=list[KeywordIdeaRead])
-async def list_ideas(client_id: int):
-    """List all keyword ideas for a client."""
+@router.get("/top", response_model=list[ScoredKeywordIdeaRead])
+async def top_ideas(
+    request: Request,
+    client_id: int,
+    k: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+):
+    """List the ``k`` keyword ideas with the best quality score, best first.
+
+    The score weighs search volume against keyword difficulty; see
+    ``app.scoring.quality_scores``.
+    """
+    repo = get_repository()
+    if not repo.get_client(client_id):
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    def build() -> bytes:
+        columns = repo.keyword_columns(client_id)
+        positions, scores = top_positions(columns, k)
+        return _scored_adapter.dump_json(
+            [
+                ScoredKeywordIdeaRead.model_construct(
+                    **idea.__dict__, quality=round(float(score), 4)
+                )
+                for idea, score in zip(columns.models(positions), scores)
+            ]
+        )
+
+    return cached_json_response(request, "keyword_ideas", client_id, build)
+
+
+@router.get("/search", response_model=list[KeywordSuggestionRead])
+async def search_keywords(
+    request: Request,
+    response: Response,
+    client_id: int,
+    prefix: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+):
+    """Suggest keywords of the client's ideas, clusters and sets that start
+    with ``prefix`` (case-insensitive), most search volume first."""
+    repo = get_repository()
+    if not repo.get_client(client_id):
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    etag = repo.etag(
+        ("keyword_ideas", client_id),
+        ("keyword_clusters", client_id),
+        ("keyword_sets", client_id),
+    )
+    not_modified = not_modified_response(request.headers, etag)
+    if not_modified:
+        return not_modified
+    response.headers["ETag"] = etag
+    return get_prefix_search().search(client_id, prefix, limit)
+
+
+@router.get(
+    "/ideas",
+    response_model=list[KeywordIdeaRead]
+    | ChangeSet[KeywordIdeaRead]
+    | Page[KeywordIdeaRead],
+)
+async def list_ideas(
+    request: Request,
+    client_id: int,
+    since: datetime | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    order: SortOrder = "volume",
+    min_sv: int | None = None,
+    max_kd: int | None = None,
+):
+    """List all keyword ideas for a client.
+
+    With ``since``, return only the keyword ideas changed or deleted after
+    it. With ``limit`` or ``cursor``, return one page ordered by
+    ``order`` and the cursor of the next page. ``min_sv`` and ``max_kd``
+    keep only ideas with at least that search volume and at most that
+    keyword difficulty; filtered results are ordered by ``order``.
+    """
     # Check if client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
 
-    return get_keyword_ideas(client_id)
+    filtered = min_sv is not None or max_kd is not None
+    if since is not None:
+        _check_not_paged(cursor, limit)
+        if filtered:
+            raise HTTPException(
+                status_code=400,
+                detail="since cannot be combined with min_sv or max_kd",
+            )
+        return await changes_json_response(
+            request, "keyword_ideas", client_id, since, KeywordIdeaRead
+        )
 
+    if filtered:
+        ideas = repo.filter_keyword_ideas(client_id, min_sv, max_kd, order)
+        if cursor is not None or limit is not None:
+            return _paged_response(
+                request,
+                "keyword_ideas",
+                client_id,
+                KeywordIdeaRead,
+                order,
+                cursor,
+                limit,
+                ideas,
+            )
+        return cached_json_response(
+            request,
+            "keyword_ideas",
+            client_id,
+            lambda: _ideas_adapter.dump_json(ideas.rows),
+        )
 
-@router.post("/best-alternate", response_model=BestAlternateRead)
-async def best_alternate(request: BestAlternateRequest):
-    """Find the best alternate keyword (stub, wait 5s)."""
-    await delay_response(5)
-    
-    # Find the keyword idea to get client_id
-    all_ideas = []
-    for client_id in [1, 2]:
-        all_ideas.extend(get_keyword_ideas(client_id))
-    
-    keyword_idea = next((k for k in all_ideas if k.id == request.keyword_id), None)
-    if not keyword_idea:
-        raise HTTPException(status_code=404, detail="Keyword idea not found")
-    
-    # Get best alternate for this client
-    alternates = get_best_alternates(keyword_idea.client_id)
-    alternate = next(
-        (a for a in alternates if a.original_keyword_id == request.keyword_id),
-        None
+    if cursor is not None or limit is not None:
+        return _paged_response(
+            request, "keyword_ideas", client_id, KeywordIdeaRead, order, cursor, limit
+        )
+
+    return cached_json_response(
+        request,
+        "keyword_ideas",
+        client_id,
+        lambda: _ideas_adapter.dump_json(repo.list_keyword_ideas(client_id)),
     )
-    
-    if not alternate:
-        # Return a stub alternate
-        return BestAlternateRead(
-            id=1,
-            client_id=keyword_idea.client_id,
-            original_keyword_id=request.keyword_id,
-            keyword=keyword_idea.keyword,
-            search_volume=keyword_idea.search_volume,
-            keyword_difficulty=keyword_idea.keyword_difficulty,
-            is_original=True,
-            created_at=keyword_idea.created_at,
-            updated_at=keyword_idea.created_at,
+
+
+async def _find_best_alternates(
+    client_id: int,
+    keyword_ids: list[int],
+    sim_threshold: float | None,
+    limit_per_seed: int | None,
+) -> list[BestAlternateRead]:
+    """Pick and store the best alternate for each seed keyword.
+
+    Candidates are the client's keywords whose TF-IDF similarity to the
+    seed is at least ``sim_threshold``; the best is the one with the most
+    search volume per point of difficulty, according to the metrics
+    provider, or the seed itself.
+    """
+    if sim_threshold is None:
+        sim_threshold = DEFAULT_SIM_THRESHOLD
+    if limit_per_seed is None:
+        limit_per_seed = DEFAULT_LIMIT_PER_SEED
+    if not 0 <= sim_threshold <= 1:
+        raise HTTPException(
+            status_code=400, detail="sim_threshold must be between 0 and 1"
         )
-    
-    return alternate
+    if limit_per_seed < 1:
+        raise HTTPException(status_code=400, detail="limit_per_seed must be at least 1")
+
+    # Keyword ids are scoped per client, so lookups are keyed by the client
+    # from the path
+    repo = get_repository()
+    seeds = []
+    for keyword_id in dict.fromkeys(keyword_ids):
+        keyword_idea = repo.get_keyword_idea(client_id, keyword_id)
+        if not keyword_idea:
+            raise HTTPException(
+                status_code=404, detail=f"Keyword idea {keyword_id} not found"
+            )
+        seeds.append(keyword_idea)
+
+    index = await get_similarity_index(repo, client_id)
+    matches = await asyncio.to_thread(
+        index.similar, [s.id for s in seeds], sim_threshold, limit_per_seed
+    )
+
+    # Build models only for the matches, and compare seeds and candidates
+    # on the metrics provider's numbers
+    candidates = {s.id: s for s in seeds}
+    matched = {m.keyword_id for found in matches.values() for m in found}
+    candidates.update(
+        (idea.id, idea)
+        for idea in repo.keyword_columns(client_id).lookup(
+            np.fromiter(matched - candidates.keys(), np.int64)
+        )
+    )
+    current = {
+        idea.id: idea
+        for idea in await get_metrics_provider().apply(list(candidates.values()))
+    }
+
+    now = get_current_timestamp()
+    alternates = []
+    for seed in seeds:
+        best = pick_best_alternate(
+            current[seed.id],
+            [
+                current[m.keyword_id]
+                for m in matches[seed.id]
+                if m.keyword_id in current
+            ],
+        )
+        existing = repo.get_best_alternate_for_keyword(client_id, seed.id)
+        alternates.append(
+            BestAlternateRead(
+                id=existing.id
+                if existing
+                else repo.allocate_id("best_alternates", client_id),
+                client_id=client_id,
+                original_keyword_id=seed.id,
+                keyword=best.keyword,
+                search_volume=best.search_volume,
+                keyword_difficulty=best.keyword_difficulty,
+                is_original=best.id == seed.id,
+                created_at=existing.created_at if existing else now,
+                updated_at=now,
+            )
+        )
+    return await repo.save_many("best_alternates", alternates)
+
+
+@router.post("/best-alternate", response_model=BestAlternateRead)
+async def best_alternate(client_id: int, request: BestAlternateRequest):
+    """Find the best alternate for a keyword among similar keywords."""
+    repo = get_repository()
+    if not repo.get_client(client_id):
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    alternates = await _find_best_alternates(
+        client_id, [request.keyword_id], request.sim_threshold, request.limit_per_seed
+    )
+    return alternates[0]
+
+
+@router.post("/best-alternate/batch", response_model=list[BestAlternateRead])
+async def best_alternate_batch(client_id: int, request: BestAlternateBatchRequest):
+    """Find the best alternates for many keywords in one pass."""
+    repo = get_repository()
+    if not repo.get_client(client_id):
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    if not request.keyword_ids:
+        raise HTTPException(status_code=400, detail="keyword_ids cannot be empty")
+
+    return await _find_best_alternates(
+        client_id, request.keyword_ids, request.sim_threshold, request.limit_per_seed
+    )
 
 
 @router.get("/best-alternates", response_model=list[BestAlternateRead])
-async def list_best_alternates(client_id: int):
+async def list_best_alternates(request: Request, client_id: int):
     """List all best alternates for a client."""
     # Check if client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
 
-    return get_best_alternates(client_id)
+    return cached_json_response(
+        request,
+        "best_alternates",
+        client_id,
+        lambda: _best_alternates_adapter.dump_json(
+            repo.list_best_alternates(client_id)
+        ),
+    )
+
 
+@router.get(
+    "/clusters",
+    response_model=list[KeywordClusterRead]
+    | ChangeSet[KeywordClusterRead]
+    | Page[KeywordClusterRead],
+)
+async def list_clusters(
+    request: Request,
+    client_id: int,
+    since: datetime | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    order: SortOrder = "volume",
+):
+    """List all keyword clusters for a client.
 
-@router.get("/clusters", response_model=list[KeywordClusterRead])
-async def list_clusters(client_id: int):
-    """List all keyword clusters for a client."""
+    With ``since``, return only the clusters changed or deleted after it.
+    With ``limit`` or ``cursor``, return one page ordered by total search
+    volume or label and the cursor of the next page.
+    """
     # Check if client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
 
-    return get_keyword_clusters(client_id)
+    if since is not None:
+        _check_not_paged(cursor, limit)
+        return await changes_json_response(
+            request, "keyword_clusters", client_id, since, KeywordClusterRead
+        )
+
+    if cursor is not None or limit is not None:
+        return _paged_response(
+            request,
+            "keyword_clusters",
+            client_id,
+            KeywordClusterRead,
+            order,
+            cursor,
+            limit,
+        )
+
+    return cached_json_response(
+        request,
+        "keyword_clusters",
+        client_id,
+        lambda: _clusters_adapter.dump_json(repo.list_keyword_clusters(client_id)),
+    )
+
+
+@router.post("/clusters/refresh", response_model=list[KeywordClusterRead])
+async def refresh_clusters(client_id: int):
+    """Re-cluster the client's keyword ideas and store the clusters.
+
+    Only keyword ideas added since the last run are clustered; deleting or
+    renaming an idea triggers a full re-cluster.
+    """
+    repo = get_repository()
+    if not repo.get_client(client_id):
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    return await get_clustering_service().recluster(repo, client_id)
 
 
 @router.post("/develop-sets", response_model=list[KeywordSetRead])
@@ -157,30 +586,72 @@ async def develop_sets(
     client_id: int,
     request: DevelopSetsRequest,
 ):
-    """Develop keyword sets (stub, wait 5s)."""
+    """Develop keyword sets from the selected keyword ideas.
+
+    Only keywords with at least ``min_sv`` search volume, according to the
+    metrics provider, can be selected.
+    """
     # Check if client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
     
     # Validate request
     if not request.keyword_ids:
         raise HTTPException(status_code=400, detail="keyword_ids cannot be empty")
     
-    await delay_response(5)
-    
-    return get_keyword_sets(client_id)
+    keyword_ids = list(dict.fromkeys(request.keyword_ids))
+    missing = [i for i in keyword_ids if not repo.get_keyword_idea(client_id, i)]
+    if missing:
+        raise HTTPException(
+            status_code=404, detail=f"Keyword ideas not found: {missing}"
+        )
+    selected = await get_metrics_provider().apply(
+        [repo.get_keyword_idea(client_id, i) for i in keyword_ids]
+    )
+    selected = [k for k in selected if _matches_metrics(k, request.min_sv, None)]
+    return await develop_keyword_sets(repo, client_id, selected)
+
 
+@router.get(
+    "/sets",
+    response_model=list[KeywordSetRead]
+    | ChangeSet[KeywordSetRead]
+    | Page[KeywordSetRead],
+)
+async def list_sets(
+    request: Request,
+    client_id: int,
+    since: datetime | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    order: SortOrder = "volume",
+):
+    """List all keyword sets for a client.
 
-@router.get("/sets", response_model=list[KeywordSetRead])
-async def list_sets(client_id: int):
-    """List all keyword sets for a client."""
+    With ``since``, return only the sets changed or deleted after it. With
+    ``limit`` or ``cursor``, return one page ordered by primary keyword
+    volume or text and the cursor of the next page.
+    """
     # Check if client exists
-    clients = get_clients()
-    client = next((c for c in clients if c.id == client_id), None)
-    if not client:
+    repo = get_repository()
+    if not repo.get_client(client_id):
         raise HTTPException(status_code=404, detail="Client not found")
 
-    return get_keyword_sets(client_id)
+    if since is not None:
+        _check_not_paged(cursor, limit)
+        return await changes_json_response(
+            request, "keyword_sets", client_id, since, KeywordSetRead
+        )
 
+    if cursor is not None or limit is not None:
+        return _paged_response(
+            request, "keyword_sets", client_id, KeywordSetRead, order, cursor, limit
+        )
+
+    return cached_json_response(
+        request,
+        "keyword_sets",
+        client_id,
+        lambda: _sets_adapter.dump_json(repo.list_keyword_sets(client_id)),
+    )
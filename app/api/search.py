@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from app.repository import get_repository
+from app.responses import not_modified_response
+from app.schemas.models import SearchResultRead
+from app.search import KINDS, get_search_service
+
+router = APIRouter()
+
+MAX_RESULTS = 100
+
+
+@router.get("", response_model=list[SearchResultRead])
+async def search(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1),
+    client_id: int | None = None,
+    limit: int = Query(20, ge=1, le=MAX_RESULTS),
+):
+    """Full-text search over blog ideas, keyword sets and blog posts.
+
+    Results are ranked by BM25, optionally within one client.
+    """
+    repo = get_repository()
+    if client_id is not None and not repo.get_client(client_id):
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    etag = repo.etag(*((table, client_id) for table in KINDS))
+    not_modified = not_modified_response(request.headers, etag)
+    if not_modified:
+        return not_modified
+    response.headers["ETag"] = etag
+    return get_search_service().search(q, client_id, limit)
@@ -0,0 +1,189 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from app.config import get_settings
+
+HTML_DIR = Path(__file__).parent / "data" / "html"
+
+# client_{client_id}_idea_{blog_idea_id}[_v{version}].html
+_FILENAME_RE = re.compile(r"^client_(\d+)_idea_(\d+)(?:_v(\d+))?\.html$")
+
+
+class ArtifactIndex:
+    """Index of HTML artifact files keyed by (client_id, blog_idea_id, version).
+
+    The directory is scanned once and rescanned only when its mtime changes,
+    which happens whenever a generation worker adds, renames or removes a
+    file. Unversioned files are stored under version ``None`` and used as a
+    fallback for any version that has no file of its own.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._files: dict[tuple[int, int], dict[int | None, Path]] = {}
+        self._latest: dict[tuple[int, int], int] = {}
+        self._scanned_mtime: int | None = None
+        self._lock = threading.Lock()
+
+    def _scan(self) -> None:
+        files: dict[tuple[int, int], dict[int | None, Path]] = {}
+        latest: dict[tuple[int, int], int] = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                match = _FILENAME_RE.match(entry.name)
+                if not match or not entry.is_file():
+                    continue
+                key = (int(match.group(1)), int(match.group(2)))
+                version = int(match.group(3)) if match.group(3) else None
+                files.setdefault(key, {})[version] = Path(entry.path)
+                if version is not None and version > latest.get(key, 0):
+                    latest[key] = version
+        self._files = files
+        self._latest = latest
+
+    def refresh(self) -> None:
+        """Rescan the directory if it changed since the last scan."""
+        try:
+            mtime = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._scanned_mtime and self._scanned_mtime is not None:
+            return
+        with self._lock:
+            if mtime is None:
+                self._files, self._latest = {}, {}
+            else:
+                self._scan()
+            self._scanned_mtime = mtime
+
+    def versions(self, client_id: int, blog_idea_id: int) -> list[int]:
+        """Return the explicit versions available for a blog idea, ascending."""
+        self.refresh()
+        files = self._files.get((client_id, blog_idea_id), {})
+        return sorted(v for v in files if v is not None)
+
+    def has_artifacts(self, client_id: int, blog_idea_id: int) -> bool:
+        self.refresh()
+        return (client_id, blog_idea_id) in self._files
+
+    def resolve(
+        self,
+        client_id: int,
+        blog_idea_id: int,
+        version: int | None = None,
+        latest: bool = False,
+    ) -> tuple[int, Path] | None:
+        """Find the file for a blog idea version.
+
+        With ``latest`` the newest explicit version wins. Otherwise the
+        requested version (default 1) is used, falling back to the
+        unversioned file. Returns ``(version_number, path)`` or ``None``.
+        """
+        self.refresh()
+        key = (client_id, blog_idea_id)
+        files = self._files.get(key)
+        if not files:
+            return None
+        if latest:
+            version = self._latest.get(key, 1)
+        elif version is None:
+            version = 1
+        path = files.get(version) or files.get(None)
+        if path is None:
+            return None
+        return version, path
+
+
+@dataclass
+class _CacheEntry:
+    mtime_ns: int
+    size: int
+    content: str
+
+
+class ArtifactCache:
+    """LRU cache of artifact contents bounded by total size in bytes.
+
+    Entries are keyed by (path, version) and revalidated with a single
+    ``stat`` on every hit: if the file's mtime or size changed since it was
+    cached (e.g. a worker rewrote it), the entry is dropped and reloaded.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[Path, int], _CacheEntry] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def read(self, path: Path, version: int) -> str:
+        """Return the contents of ``path``, from cache when still fresh."""
+        stat_result = os.stat(path)
+        key = (path, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if (
+                    entry.mtime_ns == stat_result.st_mtime_ns
+                    and entry.size == stat_result.st_size
+                ):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.content
+                self._remove(key)
+                self.invalidations += 1
+            self.misses += 1
+
+        content = path.read_text(encoding="utf-8")
+        if stat_result.st_size > self.max_bytes:
+            return content
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _CacheEntry(
+                stat_result.st_mtime_ns, stat_result.st_size, content
+            )
+            self._total_bytes += stat_result.st_size
+            while self._total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return content
+
+    def _remove(self, key: tuple[Path, int]) -> None:
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+@lru_cache()
+def get_artifact_index() -> ArtifactIndex:
+    return ArtifactIndex(HTML_DIR)
+
+
+@lru_cache()
+def get_artifact_cache() -> ArtifactCache:
+    return ArtifactCache(get_settings().ARTIFACT_CACHE_MAX_BYTES)
@@ -0,0 +1,253 @@
+import heapq
+from bisect import bisect_left, insort
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+from pydantic import BaseModel
+
+from app.schemas.models import (
+    KeywordClusterRead,
+    KeywordIdeaRead,
+    KeywordSetRead,
+    KeywordSuggestionRead,
+)
+
+if TYPE_CHECKING:
+    from app.repository import Repository
+
+# Tables whose keywords are searchable, and the source name reported
+SOURCES = {
+    "keyword_ideas": "idea",
+    "keyword_clusters": "cluster",
+    "keyword_sets": "set",
+}
+MAX_SUGGESTIONS = 50
+# Results for prefixes up to this length are cached: their ranges of the
+# sorted keys are the largest
+CACHED_PREFIX_LENGTH = 3
+# Changed keys above which the sorted keys are rebuilt instead of patched
+_REBUILD_THRESHOLD = 64
+
+
+def prefix_key(keyword: str) -> str:
+    """Lowercase a keyword and collapse its whitespace."""
+    return " ".join(keyword.lower().split())
+
+
+def _prefix_end(prefix: str) -> str:
+    """The smallest string greater than every string starting with
+    ``prefix``."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _volume(search_volume: int | None) -> int:
+    # Keywords without a volume rank after keywords with volume 0
+    return -1 if search_volume is None else search_volume
+
+
+def _row_keywords(row: BaseModel) -> list[tuple[str, int | None]]:
+    """Return the (keyword, search volume) pairs a row contributes."""
+    if isinstance(row, KeywordIdeaRead):
+        return [(row.keyword, row.search_volume)]
+    if isinstance(row, KeywordClusterRead):
+        return [(k.keyword, k.search_volume) for k in row.keywords or []]
+    if isinstance(row, KeywordSetRead):
+        pairs = [(row.primary_keyword, row.primary_search_volume)]
+        for secondary in row.secondaries or []:
+            if secondary.get("keyword"):
+                pairs.append((secondary["keyword"], secondary.get("sv")))
+        return pairs
+    return []
+
+
+class PrefixIndex:
+    """Keywords of one client's ideas, clusters and sets, normalized and
+    kept in a sorted list, so the keywords starting with a prefix are one
+    ``bisect`` range.
+
+    A normalized keyword found in several rows is listed once, with its
+    highest search volume and the sources it came from. Rows are added
+    and removed one by one as they change.
+    """
+
+    def __init__(self) -> None:
+        self._keys: list[str] = []
+        # key -> {(table, row_id, n): (search_volume, keyword)}
+        self._entries: dict[str, dict[tuple, tuple[int | None, str]]] = {}
+        # (table, row_id) -> keys it contributes to
+        self._rows: dict[tuple[str, int], list[str]] = {}
+        # key -> (volume or -1, keyword, sources)
+        self._best: dict[str, tuple[int, str, tuple[str, ...]]] = {}
+        self._cache: dict[str, list[KeywordSuggestionRead]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def update(
+        self, table: str, saved: Iterable[BaseModel], deleted: Iterable[int] = ()
+    ) -> None:
+        """Apply the rows written to and deleted from ``table``."""
+        self.apply(table, ((row.id, _row_keywords(row)) for row in saved), deleted)
+
+    def apply(
+        self,
+        table: str,
+        saved: Iterable[tuple[int, list[tuple[str, int | None]]]],
+        deleted: Iterable[int] = (),
+    ) -> None:
+        """Like ``update``, with each saved row given as its id and its
+        (keyword, search volume) pairs."""
+        changed: set[str] = set()
+        for row_id in deleted:
+            changed.update(self._remove(table, row_id))
+        for row_id, pairs in saved:
+            changed.update(self._remove(table, row_id))
+            keys = []
+            for n, (keyword, volume) in enumerate(pairs):
+                key = prefix_key(keyword)
+                if not key:
+                    continue
+                self._entries.setdefault(key, {})[(table, row_id, n)] = (
+                    volume,
+                    keyword,
+                )
+                keys.append(key)
+            if keys:
+                self._rows[(table, row_id)] = keys
+            changed.update(keys)
+        self._refresh(changed)
+
+    def _remove(self, table: str, row_id: int) -> list[str]:
+        keys = self._rows.pop((table, row_id), [])
+        for key in keys:
+            entry = self._entries[key]
+            for ref in [r for r in entry if r[0] == table and r[1] == row_id]:
+                del entry[ref]
+        return keys
+
+    def _refresh(self, changed: set[str]) -> None:
+        added, removed = [], []
+        for key in changed:
+            entry = self._entries.get(key)
+            if not entry:
+                self._entries.pop(key, None)
+                if self._best.pop(key, None) is not None:
+                    removed.append(key)
+                continue
+            if key not in self._best:
+                added.append(key)
+            if len(entry) == 1:
+                ((table, _, _), (volume, keyword)), = entry.items()
+                sources: tuple[str, ...] = (SOURCES[table],)
+            else:
+                volume, keyword = max(entry.values(), key=lambda v: _volume(v[0]))
+                sources = tuple(sorted({SOURCES[ref[0]] for ref in entry}))
+            self._best[key] = (_volume(volume), keyword, sources)
+        if self._cache:
+            for key in changed:
+                for length in range(1, CACHED_PREFIX_LENGTH + 1):
+                    self._cache.pop(key[:length], None)
+
+        if len(added) + len(removed) > _REBUILD_THRESHOLD:
+            self._keys = sorted(self._best)
+            return
+        for key in removed:
+            del self._keys[bisect_left(self._keys, key)]
+        for key in added:
+            insort(self._keys, key)
+
+    def search(self, prefix: str, limit: int) -> list[KeywordSuggestionRead]:
+        """Return up to ``limit`` keywords starting with ``prefix``, most
+        search volume first, then alphabetically."""
+        prefix = prefix_key(prefix)
+        if not prefix:
+            return []
+        cached = len(prefix) <= CACHED_PREFIX_LENGTH
+        if cached and prefix in self._cache:
+            return self._cache[prefix][:limit]
+
+        start = bisect_left(self._keys, prefix)
+        end = bisect_left(self._keys, _prefix_end(prefix), lo=start)
+        best = self._best
+        keys = heapq.nsmallest(
+            MAX_SUGGESTIONS if cached else limit,
+            self._keys[start:end],
+            key=lambda k: (-best[k][0], k),
+        )
+        results = []
+        for key in keys:
+            volume, keyword, sources = best[key]
+            results.append(
+                KeywordSuggestionRead(
+                    keyword=keyword,
+                    search_volume=None if volume < 0 else volume,
+                    sources=list(sources),
+                )
+            )
+        if cached:
+            self._cache[prefix] = results
+        return results[:limit]
+
+
+class PrefixSearch:
+    """Keeps a ``PrefixIndex`` per client, built on first search and then
+    updated from the repository's row changes."""
+
+    def __init__(self, repo: "Repository") -> None:
+        self.repo = repo
+        self._indexes: dict[int, PrefixIndex] = {}
+        repo.subscribe_rows(self._on_rows)
+
+    def _on_rows(
+        self,
+        table: str,
+        client_id: int,
+        saved: Sequence[BaseModel],
+        deleted: Sequence[int] | None,
+    ) -> None:
+        if deleted is None:
+            # Every row of the client is gone
+            self._indexes.pop(client_id, None)
+            return
+        index = self._indexes.get(client_id)
+        if index is not None and table in SOURCES:
+            index.update(table, saved, deleted)
+
+    def index(self, client_id: int) -> PrefixIndex:
+        index = self._indexes.get(client_id)
+        if index is None:
+            index = PrefixIndex()
+            # Read ideas straight from the columns, without building models
+            columns = self.repo.keyword_columns(client_id)
+            positions = columns.positions()
+            volumes, has_volume, _, _ = columns.metrics(positions)
+            index.apply(
+                "keyword_ideas",
+                (
+                    (keyword_id, [(keyword, volume if known else None)])
+                    for keyword_id, keyword, volume, known in zip(
+                        columns.ids(positions).tolist(),
+                        columns.keywords(positions),
+                        volumes.tolist(),
+                        has_volume.tolist(),
+                    )
+                ),
+            )
+            index.update(
+                "keyword_clusters", self.repo.list_keyword_clusters(client_id)
+            )
+            index.update("keyword_sets", self.repo.list_keyword_sets(client_id))
+            self._indexes[client_id] = index
+        return index
+
+    def search(
+        self, client_id: int, prefix: str, limit: int
+    ) -> list[KeywordSuggestionRead]:
+        return self.index(client_id).search(prefix, limit)
+
+
+@lru_cache()
+def get_prefix_search() -> PrefixSearch:
+    from app.repository import get_repository
+
+    return PrefixSearch(get_repository())
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable
+
+from fastapi import Request, Response
+
+from app.config import get_settings
+from app.repository import get_repository
+from app.responses import not_modified_response
+
+CacheKey = tuple[str, int | None, str, str]
+
+
+class ResponseCache:
+    """LRU cache of pre-encoded JSON response bodies.
+
+    Bodies are keyed by (table, client_id, path, query) and dropped as soon
+    as the repository reports a write to the same table and client, so a
+    cached body is always the current encoding of the data.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._bodies: OrderedDict[CacheKey, bytes] = OrderedDict()
+        self._keys: dict[tuple[str, int | None], set[CacheKey]] = {}
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: CacheKey) -> bytes | None:
+        body = self._bodies.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._bodies.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key: CacheKey, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        if key in self._bodies:
+            self._remove(key)
+        self._bodies[key] = body
+        self._keys.setdefault(key[:2], set()).add(key)
+        self._total_bytes += len(body)
+        while self._total_bytes > self.max_bytes:
+            self._remove(next(iter(self._bodies)))
+            self.evictions += 1
+
+    def _remove(self, key: CacheKey) -> None:
+        body = self._bodies.pop(key)
+        self._total_bytes -= len(body)
+        keys = self._keys.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+
+    def invalidate(self, table: str, client_id: int) -> None:
+        """Drop every body built from ``table`` rows of ``client_id``.
+
+        Entries cached without a client (e.g. the client list) are dropped
+        on any write to their table.
+        """
+        for scope in ((table, client_id), (table, None)):
+            for key in self._keys.pop(scope, ()):
+                if key in self._bodies:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._bodies),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+@lru_cache()
+def get_response_cache() -> ResponseCache:
+    cache = ResponseCache(get_settings().RESPONSE_CACHE_MAX_BYTES)
+    get_repository().subscribe(cache.invalidate)
+    return cache
+
+
+def cached_json_response(
+    request: Request,
+    table: str,
+    client_id: int | None,
+    build: Callable[[], bytes],
+) -> Response:
+    """Serve a JSON body from the response cache, encoding it on a miss.
+
+    The ETag comes from the version stamp of ``(table, client_id)``, so a
+    matching If-None-Match is answered with 304 before touching the cache.
+    ``build`` must encode synchronously so no write can slip in between
+    reading the data and caching its encoding.
+    """
+    etag = get_repository().etag((table, client_id))
+    not_modified = not_modified_response(request.headers, etag)
+    if not_modified:
+        return not_modified
+
+    cache = get_response_cache()
+    query = "&".join(
+        sorted(f"{k}={v}" for k, v in request.query_params.multi_items())
+    )
+    key = (table, client_id, request.url.path, query)
+    body = cache.get(key)
+    if body is None:
+        body = build()
+        cache.put(key, body)
+    return Response(
+        content=body, media_type="application/json", headers={"ETag": etag}
+    )
@@ -0,0 +1,445 @@
+import asyncio
+import re
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Sequence
+
+import numpy as np
+
+from app.schemas.models import (
+    KeywordClusterKeywordRead,
+    KeywordClusterRead,
+    KeywordIdeaRead,
+)
+from app.similarity import expand_ranges, keyword_tokens, token_features
+from app.utils import get_current_timestamp
+
+if TYPE_CHECKING:
+    from app.repository import Repository
+
+NUM_PERM = 64
+# LSH bands of ROWS signature values each. Keywords share a bucket with
+# probability 1 - (1 - J**ROWS)**BANDS for Jaccard similarity J: about 6%
+# at J=0.25 and 64% at J=0.5.
+ROWS = 4
+BANDS = NUM_PERM // ROWS
+# Share of equal MinHash values (an estimate of the Jaccard similarity of
+# the feature sets) needed to put two keywords in the same cluster
+MATCH_THRESHOLD = 0.5
+# Agreement above which two keywords are treated as the same keyword
+DEDUP_THRESHOLD = 0.8
+# Members of an LSH bucket each new keyword is compared with
+MAX_CANDIDATES = 8
+
+# Signature value of keywords without features
+_EMPTY = np.iinfo(np.uint32).max
+# Each permutation is x -> xorshift((x ^ seed) * odd multiplier) on uint32
+_rng = np.random.default_rng(20240101)
+_SEEDS = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64).astype(np.uint32)
+_MULTIPLIERS = (
+    _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64).astype(np.uint32) | 1
+)
+# Keywords hashed at once while computing signatures
+_CHUNK = 4096
+
+
+@lru_cache(maxsize=1 << 18)
+def _token_hashes(token: str) -> tuple[int, ...]:
+    return tuple(zlib.crc32(feature.encode()) for feature in token_features(token))
+
+
+def minhash_signatures(keywords: Sequence[str]) -> np.ndarray:
+    """Return the (len(keywords), NUM_PERM) MinHash signatures of the
+    keywords' token and trigram sets.
+
+    Keywords without any feature get an all-``_EMPTY`` signature.
+    """
+    counts: list[int] = []
+    hashes: list[int] = []
+    for keyword in keywords:
+        features: set[int] = set()
+        for token in keyword_tokens(keyword):
+            features.update(_token_hashes(token))
+        counts.append(len(features))
+        hashes += features
+    ptr = np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+    hashes_a = np.asarray(hashes, dtype=np.uint32)
+    signatures = np.full((len(keywords), NUM_PERM), _EMPTY, dtype=np.uint32)
+    for start in range(0, len(keywords), _CHUNK):
+        rows = np.arange(start, min(start + _CHUNK, len(keywords)))
+        rows = rows[ptr[rows + 1] > ptr[rows]]
+        if not len(rows):
+            continue
+        first, last = ptr[rows[0]], ptr[rows[-1] + 1]
+        values = (hashes_a[first:last, None] ^ _SEEDS) * _MULTIPLIERS
+        values ^= values >> 16
+        signatures[rows] = np.minimum.reduceat(values, ptr[rows] - first, axis=0)
+    return signatures
+
+
+def _band_keys(signatures: np.ndarray) -> np.ndarray:
+    """Hash each band of ROWS signature values into one uint64 key."""
+    sig = signatures.astype(np.uint64).reshape(len(signatures), BANDS, ROWS)
+    keys = np.zeros((len(signatures), BANDS), dtype=np.uint64)
+    for row in range(ROWS):
+        # Wrapping multiply-add, like a polynomial string hash
+        keys = keys * np.uint64(0x100000001B3) + sig[:, :, row]
+    return keys
+
+
+class _UnionFind:
+    """Disjoint sets over positions 0..n-1, unioned in vectorized passes.
+
+    Every root is the smallest position of its set, so ``parent[x] <= x``.
+    """
+
+    def __init__(self) -> None:
+        self.parent = np.zeros(0, dtype=np.int64)
+
+    def grow(self, n: int) -> None:
+        old = len(self.parent)
+        self.parent = np.concatenate((self.parent, np.arange(old, n)))
+
+    def find(self, x: np.ndarray) -> np.ndarray:
+        while True:
+            px = self.parent[x]
+            if np.array_equal(px, x):
+                return x
+            x = px
+
+    def union(self, u: np.ndarray, v: np.ndarray) -> None:
+        while len(u):
+            ru, rv = self.find(u), self.find(v)
+            split = ru != rv
+            if not split.any():
+                break
+            ru, rv, u, v = ru[split], rv[split], u[split], v[split]
+            np.minimum.at(self.parent, np.maximum(ru, rv), np.minimum(ru, rv))
+        # Point every position straight at its root
+        while True:
+            compressed = self.parent[self.parent]
+            if np.array_equal(compressed, self.parent):
+                break
+            self.parent = compressed
+
+
+class ClusterEngine:
+    """Incremental MinHash-LSH clustering of one client's keywords.
+
+    A new keyword is compared only with a few members of each LSH bucket it
+    falls in, and joined to those whose signatures agree with its own on at
+    least ``MATCH_THRESHOLD`` of the values. Clusters are the connected
+    components. Adding keywords touches only the new keywords' buckets, so
+    clustering grows sub-quadratically and existing keywords are never
+    re-hashed.
+    """
+
+    def __init__(self, threshold: float = MATCH_THRESHOLD) -> None:
+        self.threshold = threshold
+        self.keyword_ids: list[int] = []
+        self.keywords: dict[int, str] = {}
+        self._signatures = np.zeros((0, NUM_PERM), dtype=np.uint32)
+        self._valid = np.zeros(0, dtype=bool)
+        # Per band: bucket keys sorted, and the position of each key
+        self._band_keys = [np.zeros(0, dtype=np.uint64) for _ in range(BANDS)]
+        self._band_positions = [np.zeros(0, dtype=np.int64) for _ in range(BANDS)]
+        self._sets = _UnionFind()
+
+    def __len__(self) -> int:
+        return len(self.keyword_ids)
+
+    def is_current(self, keyword_ids: Sequence[int], keywords: Sequence[str]) -> bool:
+        """Whether the keywords only add to what was clustered."""
+        current = dict(zip(keyword_ids, keywords))
+        return all(current.get(i) == k for i, k in self.keywords.items())
+
+    def agreement(self, u: np.ndarray | list[int], v: np.ndarray | int) -> np.ndarray:
+        """Estimated Jaccard similarity of keywords ``u`` and ``v``."""
+        return (self._signatures[u] == self._signatures[v]).mean(axis=1)
+
+    def add(
+        self,
+        keyword_ids: Sequence[int],
+        keywords: Sequence[str],
+        normalize: Callable[[str], str] | None = None,
+    ) -> None:
+        """Cluster the keywords whose ids are not in the engine yet.
+
+        With ``normalize``, keywords are hashed after passing through it.
+        """
+        new = [
+            (i, k) for i, k in zip(keyword_ids, keywords) if i not in self.keywords
+        ]
+        if not new:
+            return
+        start = len(self.keyword_ids)
+        texts = [normalize(k) if normalize else k for _, k in new]
+        signatures = minhash_signatures(texts)
+        self.keyword_ids += [i for i, _ in new]
+        self.keywords.update(new)
+        self._signatures = np.concatenate((self._signatures, signatures))
+        self._valid = np.concatenate(
+            (self._valid, (signatures != _EMPTY).any(axis=1))
+        )
+        self._sets.grow(len(self.keyword_ids))
+
+        new_positions = np.arange(start, len(self.keyword_ids))
+        keys = _band_keys(signatures)
+        pairs_u, pairs_v = [], []
+        for band in range(BANDS):
+            # Old positions sort before new ones within a bucket, so new
+            # keywords are compared with the bucket's oldest members first
+            band_keys = np.concatenate((self._band_keys[band], keys[:, band]))
+            positions = np.concatenate((self._band_positions[band], new_positions))
+            order = np.lexsort((positions, band_keys))
+            band_keys, positions = band_keys[order], positions[order]
+            self._band_keys[band], self._band_positions[band] = band_keys, positions
+
+            lo = np.searchsorted(band_keys, keys[:, band], side="left")
+            hi = np.searchsorted(band_keys, keys[:, band], side="right")
+            hi = np.minimum(hi, lo + MAX_CANDIDATES)
+            pairs_u.append(np.repeat(new_positions, hi - lo))
+            pairs_v.append(positions[expand_ranges(lo, hi)])
+
+        # The same pair usually shares several buckets; check it once
+        pairs = np.sort(
+            np.concatenate(pairs_u) * len(self.keyword_ids) + np.concatenate(pairs_v)
+        )
+        pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+        u, v = np.divmod(pairs, len(self.keyword_ids))
+        keep = (u != v) & self._valid[u] & self._valid[v]
+        u, v = u[keep], v[keep]
+        matched = self.agreement(u, v) >= self.threshold
+        self._sets.union(u[matched], v[matched])
+
+    def cluster_members(self) -> dict[int, list[int]]:
+        """Map every keyword id to the ids of all keywords in its cluster."""
+        members: dict[int, list[int]] = {}
+        for positions in self.clusters():
+            ids = [self.keyword_ids[p] for p in positions]
+            for keyword_id in ids:
+                members[keyword_id] = ids
+        return members
+
+    def clusters(self) -> list[list[int]]:
+        """Return the keyword positions of every cluster."""
+        if not self.keyword_ids:
+            return []
+        roots = self._sets.parent
+        order = np.argsort(roots, kind="stable")
+        bounds = np.flatnonzero(np.diff(roots[order])) + 1
+        return [group.tolist() for group in np.split(order, bounds)]
+
+
+_PLURAL_RE = re.compile(r"(?<=[a-z]{3})s$")
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Lowercase a keyword, drop punctuation and plural "s" endings, and
+    sort its words, so trivial variants normalize to the same text."""
+    words = [
+        token if token.endswith("ss") else _PLURAL_RE.sub("", token)
+        for token in keyword_tokens(keyword)
+    ]
+    return " ".join(sorted(words))
+
+
+@dataclass
+class DuplicateGroup:
+    representative: KeywordIdeaRead
+    variants: list[KeywordIdeaRead]
+
+
+def collapse_near_duplicates(
+    ideas: Sequence[KeywordIdeaRead], threshold: float = DEDUP_THRESHOLD
+) -> list[DuplicateGroup]:
+    """Group keywords that are near-duplicates after normalization.
+
+    The variant with the most search volume represents each group; groups
+    are returned in the order of their representative in ``ideas``.
+    """
+    engine = ClusterEngine(threshold)
+    engine.add([i.id for i in ideas], [i.keyword for i in ideas], normalize_keyword)
+    by_id = {idea.id: idea for idea in ideas}
+    groups = []
+    for positions in engine.clusters():
+        members = sorted(
+            (by_id[engine.keyword_ids[p]] for p in positions),
+            key=lambda k: (-(k.search_volume or 0), k.id),
+        )
+        groups.append(DuplicateGroup(members[0], members[1:]))
+    order = {idea.id: i for i, idea in enumerate(ideas)}
+    groups.sort(key=lambda g: order[g.representative.id])
+    return groups
+
+
+def _label(keyword: str) -> str:
+    return " ".join(word[:1].upper() + word[1:] for word in keyword.split())
+
+
+class ClusteringService:
+    """Keeps a ``ClusterEngine`` per client and turns its clusters into
+    stored ``KeywordClusterRead`` rows."""
+
+    def __init__(self) -> None:
+        self._engines: dict[int, ClusterEngine] = {}
+        # Keyword ideas version each engine is current with
+        self._versions: dict[int, int] = {}
+        # Last recluster result, with the ideas and clusters versions
+        self._results: dict[int, tuple[tuple[int, int], list[KeywordClusterRead]]] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+
+    def _engine_for(
+        self, client_id: int, keyword_ids: list[int], keywords: list[str]
+    ) -> ClusterEngine:
+        engine = self._engines.get(client_id)
+        # Deleted or renamed keywords can split clusters: start over
+        if engine is None or not engine.is_current(keyword_ids, keywords):
+            engine = self._engines[client_id] = ClusterEngine()
+        engine.add(keyword_ids, keywords)
+        return engine
+
+    async def _current_engine(
+        self, repo: "Repository", client_id: int
+    ) -> ClusterEngine:
+        version = repo.version("keyword_ideas", client_id)
+        engine = self._engines.get(client_id)
+        if engine is not None and self._versions.get(client_id) == version:
+            return engine
+        # Copy ids and keywords off the columns on the loop; no models
+        columns = repo.keyword_columns(client_id)
+        positions = columns.positions()
+        keyword_ids = columns.ids(positions).tolist()
+        keywords = columns.keywords(positions)
+        engine = await asyncio.to_thread(
+            self._engine_for, client_id, keyword_ids, keywords
+        )
+        self._versions[client_id] = version
+        return engine
+
+    async def engine(self, repo: "Repository", client_id: int) -> ClusterEngine:
+        """Return the client's engine, up to date with its keyword ideas."""
+        async with self._locks.setdefault(client_id, asyncio.Lock()):
+            return await self._current_engine(repo, client_id)
+
+    async def recluster(
+        self, repo: "Repository", client_id: int
+    ) -> list[KeywordClusterRead]:
+        """Cluster the client's keyword ideas and store the result.
+
+        Only keywords added since the last run are hashed and matched.
+        Clusters keep the id of the stored cluster most of their keywords
+        came from, and unchanged clusters are not rewritten. Without any
+        change to the ideas or clusters since the last run, its result is
+        returned as is.
+        """
+        lock = self._locks.setdefault(client_id, asyncio.Lock())
+        async with lock:
+            versions = (
+                repo.version("keyword_ideas", client_id),
+                repo.version("keyword_clusters", client_id),
+            )
+            cached = self._results.get(client_id)
+            if cached is not None and cached[0] == versions:
+                return cached[1]
+            engine = await self._current_engine(repo, client_id)
+            by_id = {
+                idea.id: idea
+                for idea in repo.keyword_columns(client_id).lookup(
+                    np.asarray(engine.keyword_ids, dtype=np.int64)
+                )
+            }
+
+            previous = {c.id: c for c in repo.list_keyword_clusters(client_id)}
+            previous_cluster_of = {
+                k.id: c.id for c in previous.values() for k in c.keywords or []
+            }
+            groups = []
+            for positions in engine.clusters():
+                # Skip keywords deleted while the engine was updated
+                positions = [p for p in positions if engine.keyword_ids[p] in by_id]
+                if not positions:
+                    continue
+                members = [by_id[engine.keyword_ids[p]] for p in positions]
+                # The keyword with the most search volume names the cluster
+                order = sorted(
+                    range(len(members)),
+                    key=lambda i: (-(members[i].search_volume or 0), members[i].id),
+                )
+                groups.append(
+                    ([positions[i] for i in order], [members[i] for i in order])
+                )
+            groups.sort(key=lambda g: (-len(g[1]), g[1][0].id))
+
+            now = get_current_timestamp()
+            taken: set[int] = set()
+            clusters, changed = [], []
+            for positions, members in groups:
+                votes = Counter(
+                    previous_cluster_of[m.id]
+                    for m in members
+                    if m.id in previous_cluster_of
+                )
+                cluster_id = next(
+                    (c for c, _ in votes.most_common() if c not in taken), None
+                )
+                if cluster_id is None:
+                    cluster_id = repo.allocate_id("keyword_clusters", client_id)
+                taken.add(cluster_id)
+                old = previous.get(cluster_id)
+                quality = engine.agreement(positions, positions[0])
+                keywords = [
+                    KeywordClusterKeywordRead(
+                        id=m.id,
+                        cluster_id=cluster_id,
+                        keyword=m.keyword,
+                        search_volume=m.search_volume,
+                        keyword_difficulty=m.keyword_difficulty,
+                        intent=None,
+                        quality=round(float(q), 4),
+                        created_at=m.created_at,
+                        updated_at=now,
+                    )
+                    for m, q in zip(members, quality)
+                ]
+                cluster = KeywordClusterRead(
+                    id=cluster_id,
+                    client_id=client_id,
+                    label=_label(members[0].keyword),
+                    created_at=old.created_at if old else now,
+                    updated_at=now,
+                    keywords=keywords,
+                )
+                if old and _same_cluster(old, cluster):
+                    cluster = old
+                else:
+                    changed.append(cluster)
+                clusters.append(cluster)
+
+            if changed:
+                await repo.save_many("keyword_clusters", changed)
+            for cluster_id in previous.keys() - taken:
+                await repo.delete("keyword_clusters", client_id, cluster_id)
+            self._results[client_id] = (
+                (
+                    self._versions[client_id],
+                    repo.version("keyword_clusters", client_id),
+                ),
+                clusters,
+            )
+            return clusters
+
+
+def _same_cluster(a: KeywordClusterRead, b: KeywordClusterRead) -> bool:
+    exclude = {"created_at", "updated_at", "keywords"}
+    keyword_exclude = {"created_at", "updated_at"}
+    return a.model_dump(exclude=exclude) == b.model_dump(exclude=exclude) and [
+        k.model_dump(exclude=keyword_exclude) for k in a.keywords or []
+    ] == [k.model_dump(exclude=keyword_exclude) for k in b.keywords or []]
+
+
+@lru_cache()
+def get_clustering_service() -> ClusteringService:
+    return ClusteringService()
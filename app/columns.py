@@ -0,0 +1,267 @@
+import sys
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+import numpy as np
+
+from app.schemas.models import KeywordIdeaRead
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_INITIAL_CAPACITY = 64
+
+
+def _to_micros(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def _intern(value: str | None) -> str | None:
+    return None if value is None else sys.intern(value)
+
+
+class KeywordColumns:
+    """Keyword ideas of one client, stored column by column.
+
+    Numbers live in NumPy arrays with a mask for nulls, strings are
+    interned, and a ``KeywordIdeaRead`` is only built when a row is read.
+    Deleted rows are masked out and compacted away once they make up half
+    of the arrays. Filters and sort orders are vectorized over the columns;
+    sort orders are cached until the next write.
+    """
+
+    _ARRAYS = (
+        "_ids",
+        "_created",
+        "_volume",
+        "_difficulty",
+        "_has_volume",
+        "_has_difficulty",
+        "_alive",
+    )
+
+    def __init__(self, client_id: int) -> None:
+        self.client_id = client_id
+        self._size = 0
+        self._dead = 0
+        self._positions: dict[int, int] = {}
+        self._keywords: list[str | None] = []
+        self._sources: list[str | None] = []
+        self._ids = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self._created = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self._volume = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self._difficulty = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self._has_volume = np.zeros(_INITIAL_CAPACITY, dtype=bool)
+        self._has_difficulty = np.zeros(_INITIAL_CAPACITY, dtype=bool)
+        self._alive = np.zeros(_INITIAL_CAPACITY, dtype=bool)
+        self._orders: dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self._size - self._dead
+
+    def __contains__(self, keyword_id: int) -> bool:
+        return keyword_id in self._positions
+
+    # Writes
+    def upsert(self, model: KeywordIdeaRead) -> None:
+        position = self._positions.get(model.id)
+        if position is None:
+            if self._size == len(self._ids):
+                self._resize(2 * len(self._ids))
+            position = self._size
+            self._size += 1
+            self._positions[model.id] = position
+            self._keywords.append(None)
+            self._sources.append(None)
+        self._ids[position] = model.id
+        self._created[position] = _to_micros(model.created_at)
+        self._volume[position] = model.search_volume or 0
+        self._has_volume[position] = model.search_volume is not None
+        self._difficulty[position] = model.keyword_difficulty or 0
+        self._has_difficulty[position] = model.keyword_difficulty is not None
+        self._alive[position] = True
+        self._keywords[position] = _intern(model.keyword)
+        self._sources[position] = _intern(model.source)
+        self._orders.clear()
+
+    def delete(self, keyword_id: int) -> None:
+        position = self._positions.pop(keyword_id, None)
+        if position is None:
+            return
+        self._alive[position] = False
+        self._keywords[position] = self._sources[position] = None
+        self._dead += 1
+        self._orders.clear()
+        if self._dead * 2 > self._size and self._size > _INITIAL_CAPACITY:
+            self._compact()
+
+    def _resize(self, capacity: int) -> None:
+        for name in self._ARRAYS:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: self._size] = old[: self._size]
+            setattr(self, name, new)
+
+    def _compact(self) -> None:
+        keep = np.flatnonzero(self._alive[: self._size])
+        for name in self._ARRAYS:
+            array = getattr(self, name)
+            array[: len(keep)] = array[keep]
+            array[len(keep) :] = 0
+        self._keywords = [self._keywords[p] for p in keep]
+        self._sources = [self._sources[p] for p in keep]
+        self._size, self._dead = len(keep), 0
+        self._positions = {int(i): p for p, i in enumerate(self._ids[: self._size])}
+
+    # Reads
+    def _model(self, position: int) -> KeywordIdeaRead:
+        # Rows were validated on the way in, so skip validation on the way out
+        return KeywordIdeaRead.model_construct(
+            id=int(self._ids[position]),
+            client_id=self.client_id,
+            keyword=self._keywords[position],
+            source=self._sources[position],
+            search_volume=int(self._volume[position])
+            if self._has_volume[position]
+            else None,
+            keyword_difficulty=int(self._difficulty[position])
+            if self._has_difficulty[position]
+            else None,
+            created_at=_EPOCH + timedelta(microseconds=int(self._created[position])),
+        )
+
+    def get(self, keyword_id: int) -> KeywordIdeaRead | None:
+        position = self._positions.get(keyword_id)
+        return None if position is None else self._model(position)
+
+    def models(self, positions: np.ndarray | None = None) -> list[KeywordIdeaRead]:
+        """Build models for ``positions``, or for every row in insertion
+        order."""
+        if positions is None:
+            positions = self.positions()
+        return [self._model(p) for p in positions.tolist()]
+
+    def lookup(self, keyword_ids: np.ndarray) -> list[KeywordIdeaRead]:
+        """Build models for the ids that are still stored, in order."""
+        positions = (self._positions.get(i) for i in keyword_ids.tolist())
+        return [self._model(p) for p in positions if p is not None]
+
+    def positions(self) -> np.ndarray:
+        """Positions of the live rows, in insertion order."""
+        return np.flatnonzero(self._alive[: self._size])
+
+    def ids(self, positions: np.ndarray | None = None) -> np.ndarray:
+        return self._ids[self.positions() if positions is None else positions]
+
+    def keywords(self, positions: np.ndarray) -> list[str]:
+        return [self._keywords[p] for p in positions.tolist()]
+
+    def metrics(
+        self, positions: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Return volume, has-volume, difficulty and has-difficulty of the
+        rows at ``positions``."""
+        return (
+            self._volume[positions],
+            self._has_volume[positions],
+            self._difficulty[positions],
+            self._has_difficulty[positions],
+        )
+
+    def select(
+        self, min_sv: int | None = None, max_kd: int | None = None
+    ) -> np.ndarray:
+        """Positions of the rows with ``search_volume >= min_sv`` and
+        ``keyword_difficulty <= max_kd``; nulls never match a filter."""
+        mask = self._alive[: self._size].copy()
+        if min_sv is not None:
+            mask &= self._has_volume[: self._size]
+            mask &= self._volume[: self._size] >= min_sv
+        if max_kd is not None:
+            mask &= self._has_difficulty[: self._size]
+            mask &= self._difficulty[: self._size] <= max_kd
+        return np.flatnonzero(mask)
+
+    # Sorting
+    def sort_key(self, order: str, position: int) -> tuple:
+        """The ``SORT_KEYS`` key of a row: (-volume, id) or (keyword, id)."""
+        keyword_id = int(self._ids[position])
+        if order == "volume":
+            volume = self._volume[position] if self._has_volume[position] else -1
+            return (-int(volume), keyword_id)
+        return (self._keywords[position].lower(), keyword_id)
+
+    def ordered(self, order: str, positions: np.ndarray | None = None) -> np.ndarray:
+        """Return ``positions`` (default: all rows) sorted by ``order``."""
+        sorted_positions = self._orders.get(order)
+        if sorted_positions is None:
+            live = self.positions()
+            if order == "volume":
+                volume = np.where(self._has_volume[live], self._volume[live], -1)
+                sorted_positions = live[np.lexsort((self._ids[live], -volume))]
+            else:
+                sorted_positions = np.asarray(
+                    sorted(live.tolist(), key=lambda p: self.sort_key(order, p)),
+                    dtype=np.int64,
+                )
+            self._orders[order] = sorted_positions
+        if positions is None:
+            return sorted_positions
+        wanted = np.zeros(self._size, dtype=bool)
+        wanted[positions] = True
+        return sorted_positions[wanted[sorted_positions]]
+
+    def sorted_view(
+        self, order: str, positions: np.ndarray | None = None
+    ) -> "SortedColumnsView":
+        return SortedColumnsView(self, order, self.ordered(order, positions))
+
+
+class SortedColumnsView:
+    """Rows of a ``KeywordColumns`` in sort order, paged like a
+    ``SortedIndex`` without building a model per row up front."""
+
+    def __init__(self, columns: KeywordColumns, order: str, positions: np.ndarray):
+        self._columns = columns
+        self._order = order
+        self._positions = positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    @property
+    def template(self) -> tuple | None:
+        if not len(self._positions):
+            return None
+        return self._columns.sort_key(self._order, int(self._positions[0]))
+
+    @property
+    def rows(self) -> list[KeywordIdeaRead]:
+        return self._columns.models(self._positions)
+
+    def page(
+        self, after: tuple | None, limit: int
+    ) -> tuple[list[KeywordIdeaRead], tuple | None]:
+        """Return up to ``limit`` rows after ``after`` and the next key."""
+        start = 0
+        if after is not None:
+            start = bisect_right(
+                self._positions,
+                after,
+                key=lambda p: self._columns.sort_key(self._order, int(p)),
+            )
+        end = start + limit
+        page = self._positions[start:end]
+        next_key = None
+        if end < len(self._positions):
+            next_key = self._columns.sort_key(self._order, int(page[-1]))
+        return self._columns.models(page), next_key
+
+    def batches(self, size: int) -> Iterator[list[KeywordIdeaRead]]:
+        """Yield the rows ``size`` at a time, building each batch only when
+        it is reached. Rows deleted in the meantime are skipped."""
+        # Positions move when the arrays are compacted; ids do not
+        ids = self._columns.ids(self._positions)
+        for start in range(0, len(ids), size):
+            yield self._columns.lookup(ids[start : start + size])
@@ -6,6 +6,29 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
     APP_ENV: str = "demo"
+    DATABASE_PATH: str = "arb_demo.db"
+    DATABASE_POOL_SIZE: int = 4
+    ARTIFACT_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    STREAM_BATCH_SIZE: int = 500
+    METRICS_BACKEND: str = "local"
+    METRICS_LOCAL_LATENCY: float = 0.0
+    METRICS_MAX_BATCH_SIZE: int = 100
+    METRICS_MAX_WAIT: float = 0.01
+    METRICS_CACHE_TTL: float = 3600.0
+    METRICS_CACHE_MAX_ENTRIES: int = 100_000
+    BLOG_IDEA_WORKERS: int = 4
+    BLOG_IDEA_QUEUE_SIZE: int = 1000
+    BLOG_IDEA_JOB_HISTORY: int = 1000
+    # Worker processes for CPU-bound pipeline stages; 0 for one per core
+    PIPELINE_WORKERS: int = 0
+    # Events buffered per stream subscriber before the oldest are dropped
+    EVENT_QUEUE_SIZE: int = 100
+    # Recent events kept per stream for clients resuming with Last-Event-ID
+    EVENT_HISTORY_SIZE: int = 100
+    EVENT_MAX_TOPICS: int = 1000
+    # Seconds a disconnected stream is kept for the client to resume it
+    SSE_RESUME_TTL: float = 300.0
 
 
 @lru_cache()
@@ -1,4 +1,5 @@
 from datetime import datetime, timezone
+from app.artifacts import get_artifact_cache, get_artifact_index
 from app.schemas.models import (
     ClientRead,
     ClientContextRead,
@@ -1262,10 +1263,10 @@ def get_blog_ideas(client_id: int) -> list[BlogIdeaRead]:
     return []
 
 
-def get_blog_post_artifact(blog_post_id: int) -> BlogPostArtifactRead | None:
-    """Get hardcoded blog post artifact."""
-    if blog_post_id == 1:
-        return BlogPostArtifactRead(
+def get_blog_post_artifacts() -> list[BlogPostArtifactRead]:
+    """Get hardcoded blog post artifacts."""
+    return [
+        BlogPostArtifactRead(
             id=1,
             client_id=1,
             blog_idea_id=1,
@@ -1285,9 +1286,8 @@ def get_blog_post_artifact(blog_post_id: int) -> BlogPostArtifactRead | None:
             title_tag="How to Choose the Right Business Management Software",
             created_at=_base_time,
             updated_at=_base_time,
-        )
-    elif blog_post_id == 2:
-        return BlogPostArtifactRead(
+        ),
+        BlogPostArtifactRead(
             id=2,
             client_id=2,
             blog_idea_id=2,
@@ -1307,81 +1307,38 @@ def get_blog_post_artifact(blog_post_id: int) -> BlogPostArtifactRead | None:
             title_tag="Top Web Design Trends for 2024",
             created_at=_base_time,
             updated_at=_base_time,
-        )
-    return None
+        ),
+    ]
+
 
+def get_blog_post_artifact(blog_post_id: int) -> BlogPostArtifactRead | None:
+    """Get hardcoded blog post artifact."""
+    return next(
+        (a for a in get_blog_post_artifacts() if a.id == blog_post_id), None
+    )
 
-def get_blog_idea_html(blog_idea_id: int, version_number: int | None = None) -> dict | None:
-    """Get hardcoded HTML for a blog idea from HTML files."""
-    from pathlib import Path
-    
-    version = version_number if version_number is not None else 1
-    
-    # We need to determine which client this blog idea belongs to
-    # Check all clients to find which one has this blog_idea_id
-    client_id = None
-    for cid in [1, 2, 7]:
-        blog_ideas = get_blog_ideas(cid)
-        if any(b.id == blog_idea_id for b in blog_ideas):
-            client_id = cid
-            break
-    
-    if client_id is None:
+
+def get_blog_idea_html(
+    client_id: int,
+    blog_idea_id: int,
+    version_number: int | None = None,
+    latest: bool = False,
+) -> dict | None:
+    """Get HTML for a blog idea from the indexed HTML artifact files."""
+    resolved = get_artifact_index().resolve(
+        client_id, blog_idea_id, version_number, latest=latest
+    )
+    if resolved is None:
         return None
-    
-    # Get the directory where this file is located
-    current_dir = Path(__file__).parent
-    html_dir = current_dir / "html"
-    
-    # Try to load HTML from file
-    # File naming convention: client_{client_id}_idea_{blog_idea_id}_v{version}.html
-    # Or fallback: client_{client_id}_idea_{blog_idea_id}.html
-    html_file = html_dir / f"client_{client_id}_idea_{blog_idea_id}_v{version}.html"
-    if not html_file.exists():
-        html_file = html_dir / f"client_{client_id}_idea_{blog_idea_id}.html"
-    
-    # Read HTML from file if it exists
-    if html_file.exists():
-        try:
-            with open(html_file, "r", encoding="utf-8") as f:
-                html_content = f.read()
-            return {
-                "blog_idea_id": blog_idea_id,
-                "version_number": version,
-                "html": html_content,
-            }
-        except Exception as e:
-            print(f"Error reading HTML file {html_file}: {e}")
-            return None
-    
-    # Fallback to default content if file doesn't exist
-    # Client 1 blog ideas
-    if blog_idea_id == 1 and version == 1:  # Assuming client 1's blog idea 1
-        return {
-            "blog_idea_id": 1,
-            "version_number": version,
-            "html": "<h1>How to Choose the Right Business Management Software</h1><p>Demo HTML content...</p>",
-        }
-    # Client 2 blog ideas (Setsail)
-    elif blog_idea_id in [1, 2, 3]:  # Setsail blog ideas
-        topics = {
-            1: "Full funnel marketing strategy when PPC plateaus: scale beyond branded search without tanking ROAS",
-            2: "Digital Marketing for Real Estate Agents: Engineering a Predictable Cost Per Closing Across PPC, Portals, and Referrals",
-            3: "Healthcare Digital Marketing Strategy for HIPAA-Safe, EMR-Verified ROI: Connecting Ads, Website Journeys, and Patient Revenue",
-        }
-        topic = topics.get(blog_idea_id, "Demo Blog Post")
-        return {
-            "blog_idea_id": blog_idea_id,
-            "version_number": version,
-            "html": f"<h1>{topic}</h1><p>Demo HTML content for Setsail blog post...</p>",
-        }
-    # Client 7 blog ideas (CleanDesign.ca)
-    elif blog_idea_id == 1:  # CleanDesign blog idea
-        topic = "Power factor correction as a hidden capacity upgrade for mission‑critical microgrids: unlocking 20–30% more real power without new generators or grid upgrades"
-        return {
-            "blog_idea_id": blog_idea_id,
-            "version_number": version,
-            "html": f"<h1>{topic}</h1><p>Demo HTML content for CleanDesign blog post...</p>",
-        }
-    return None
 
+    version, html_file = resolved
+    try:
+        html_content = get_artifact_cache().read(html_file, version)
+    except OSError as e:
+        print(f"Error reading HTML file {html_file}: {e}")
+        return None
+    return {
+        "blog_idea_id": blog_idea_id,
+        "version_number": version,
+        "html": html_content,
+    }
@@ -0,0 +1,318 @@
+import asyncio
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator
+
+from pydantic import BaseModel
+
+from app.schemas.models import (
+    BestAlternateRead,
+    BlogIdeaRead,
+    BlogPostArtifactRead,
+    ClientContextRead,
+    ClientRead,
+    HTMLArtifactRead,
+    KeywordClusterRead,
+    KeywordIdeaRead,
+    KeywordSetRead,
+)
+from app.utils import get_current_timestamp
+
+# Every entity is stored in its own table with the same layout: the indexed
+# columns are copied out of the model, the full model is kept as JSON.
+TABLES: dict[str, type[BaseModel]] = {
+    "clients": ClientRead,
+    "client_contexts": ClientContextRead,
+    "keyword_ideas": KeywordIdeaRead,
+    "keyword_clusters": KeywordClusterRead,
+    "keyword_sets": KeywordSetRead,
+    "best_alternates": BestAlternateRead,
+    "blog_ideas": BlogIdeaRead,
+    "blog_post_artifacts": BlogPostArtifactRead,
+    "html_artifacts": HTMLArtifactRead,
+}
+
+_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    client_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    state TEXT,
+    updated_at TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (client_id, id)
+);
+CREATE INDEX IF NOT EXISTS ix_{table}_client_updated ON {table} (client_id, updated_at);
+CREATE INDEX IF NOT EXISTS ix_{table}_updated ON {table} (updated_at);
+CREATE INDEX IF NOT EXISTS ix_{table}_client_state ON {table} (client_id, state);
+"""
+
+# Deleted rows are remembered so delta-sync clients can drop them too.
+_TOMBSTONES_DDL = """
+CREATE TABLE IF NOT EXISTS tombstones (
+    table_name TEXT NOT NULL,
+    client_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    deleted_at TEXT NOT NULL,
+    PRIMARY KEY (table_name, client_id, id)
+);
+CREATE INDEX IF NOT EXISTS ix_tombstones_client_deleted
+    ON tombstones (table_name, client_id, deleted_at);
+"""
+
+
+def format_timestamp(value: datetime) -> str:
+    """Format a timestamp so that lexical order matches time order."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def row_key(model: BaseModel) -> tuple[int, int]:
+    """Return the (client_id, id) primary key of a model."""
+    client_id = getattr(model, "client_id", None)
+    return (model.id if client_id is None else client_id, model.id)
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available in time."""
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared between worker threads."""
+
+    def __init__(self, path: str, size: int = 4, timeout: float = 10.0) -> None:
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path, timeout=self.timeout, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=%d" % int(self.timeout * 1000))
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"No database connection free after {self.timeout}s")
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection; commits on success, rolls back on error."""
+        conn = self._acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+class Store:
+    """SQLite-backed persistence for every entity in ``app.schemas.models``.
+
+    Methods are blocking; async callers should use the ``a``-prefixed
+    variants, which run the query on a worker thread.
+    """
+
+    def __init__(self, pool: ConnectionPool) -> None:
+        self.pool = pool
+
+    def init_schema(self) -> None:
+        with self.pool.connection() as conn:
+            for table in TABLES:
+                conn.executescript(_TABLE_DDL.format(table=table))
+            conn.executescript(_TOMBSTONES_DDL)
+
+    def is_empty(self) -> bool:
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT 1 FROM clients LIMIT 1").fetchone()
+        return row is None
+
+    def seed_from_fixtures(self) -> None:
+        """Load the demo data from ``app.data`` into an empty database."""
+        from app import data
+
+        rows: list[tuple[str, BaseModel]] = []
+        for client in data.get_clients():
+            rows.append(("clients", client))
+            context = data.get_client_context(client.id)
+            if context:
+                rows.append(("client_contexts", context))
+            rows += [("keyword_ideas", m) for m in data.get_keyword_ideas(client.id)]
+            rows += [
+                ("keyword_clusters", m) for m in data.get_keyword_clusters(client.id)
+            ]
+            rows += [("keyword_sets", m) for m in data.get_keyword_sets(client.id)]
+            rows += [
+                ("best_alternates", m) for m in data.get_best_alternates(client.id)
+            ]
+            rows += [("blog_ideas", m) for m in data.get_blog_ideas(client.id)]
+        rows += [("blog_post_artifacts", m) for m in data.get_blog_post_artifacts()]
+        self.upsert_many(rows, stamp=False)
+
+    def load(self, table: str) -> list[BaseModel]:
+        model = TABLES[table]
+        with self.pool.connection() as conn:
+            cursor = conn.execute(f"SELECT data FROM {table} ORDER BY client_id, id")
+            return [model.model_validate_json(row["data"]) for row in cursor]
+
+    def upsert_many(
+        self, rows: list[tuple[str, BaseModel]], stamp: bool = True
+    ) -> None:
+        """Insert or replace rows in one transaction.
+
+        With ``stamp`` the ``updated_at`` column records the time of this
+        write rather than the model's own timestamp (some models have no
+        ``updated_at``). The stamp is taken after the write lock is held, so
+        stamps increase in commit order and delta-sync cursors are safe.
+        """
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            now = get_current_timestamp()
+            for table, model in rows:
+                client_id, row_id = row_key(model)
+                if stamp:
+                    updated_at = now
+                else:
+                    updated_at = getattr(model, "updated_at", None) or model.created_at
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {table} "
+                    "(client_id, id, state, updated_at, data) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        client_id,
+                        row_id,
+                        getattr(model, "state", None),
+                        format_timestamp(updated_at),
+                        model.model_dump_json(),
+                    ),
+                )
+                conn.execute(
+                    "DELETE FROM tombstones "
+                    "WHERE table_name = ? AND client_id = ? AND id = ?",
+                    (table, client_id, row_id),
+                )
+
+    def upsert(self, table: str, model: BaseModel) -> None:
+        self.upsert_many([(table, model)])
+
+    def delete(self, table: str, client_id: int, row_id: int) -> None:
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                f"DELETE FROM {table} WHERE client_id = ? AND id = ?",
+                (client_id, row_id),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO tombstones "
+                "(table_name, client_id, id, deleted_at) VALUES (?, ?, ?, ?)",
+                (table, client_id, row_id, format_timestamp(get_current_timestamp())),
+            )
+
+    def delete_client(self, client_id: int) -> None:
+        """Delete a client together with every row that belongs to it,
+        leaving a tombstone for each row so delta-sync clients drop them."""
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            deleted_at = format_timestamp(get_current_timestamp())
+            for table in TABLES:
+                conn.execute(
+                    "INSERT OR REPLACE INTO tombstones "
+                    "(table_name, client_id, id, deleted_at) "
+                    f"SELECT ?, client_id, id, ? FROM {table} WHERE client_id = ?",
+                    (table, deleted_at, client_id),
+                )
+                conn.execute(f"DELETE FROM {table} WHERE client_id = ?", (client_id,))
+
+    def changes_since(
+        self, table: str, client_id: int, since: datetime
+    ) -> tuple[list[BaseModel], list[int], str]:
+        """Return rows written and ids deleted after ``since``.
+
+        Both queries are range scans on the (client_id, updated_at) and
+        (table_name, client_id, deleted_at) indexes. The returned cursor is
+        the newest stamp seen (or ``since`` itself) and can be passed back
+        as the next ``since``.
+        """
+        model = TABLES[table]
+        cursor = format_timestamp(since)
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT data, updated_at FROM {table} "
+                "WHERE client_id = ? AND updated_at > ? ORDER BY updated_at, id",
+                (client_id, cursor),
+            ).fetchall()
+            deleted = conn.execute(
+                "SELECT id, deleted_at FROM tombstones "
+                "WHERE table_name = ? AND client_id = ? AND deleted_at > ? "
+                "ORDER BY deleted_at, id",
+                (table, client_id, cursor),
+            ).fetchall()
+        stamps = [row["updated_at"] for row in rows] + [
+            row["deleted_at"] for row in deleted
+        ]
+        return (
+            [model.model_validate_json(row["data"]) for row in rows],
+            [row["id"] for row in deleted],
+            max(stamps, default=cursor),
+        )
+
+    async def aload(self, table: str) -> list[BaseModel]:
+        return await asyncio.to_thread(self.load, table)
+
+    async def aupsert(self, table: str, model: BaseModel) -> None:
+        await asyncio.to_thread(self.upsert, table, model)
+
+    async def aupsert_many(self, rows: list[tuple[str, BaseModel]]) -> None:
+        await asyncio.to_thread(self.upsert_many, rows)
+
+    async def adelete(self, table: str, client_id: int, row_id: int) -> None:
+        await asyncio.to_thread(self.delete, table, client_id, row_id)
+
+    async def adelete_client(self, client_id: int) -> None:
+        await asyncio.to_thread(self.delete_client, client_id)
+
+    async def achanges_since(
+        self, table: str, client_id: int, since: datetime
+    ) -> tuple[list[BaseModel], list[int], str]:
+        return await asyncio.to_thread(self.changes_since, table, client_id, since)
+
+
+def open_store(path: str, pool_size: int = 4) -> Store:
+    """Open the database at ``path``, creating and seeding it if needed."""
+    store = Store(ConnectionPool(path, size=pool_size))
+    store.init_schema()
+    if store.is_empty():
+        store.seed_from_fixtures()
+    return store
@@ -0,0 +1,327 @@
+import asyncio
+import itertools
+import json
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import AsyncIterator, Hashable
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+
+from app.config import get_settings
+
+# Event types that end a stream
+TERMINAL_TYPES = ("complete", "error")
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    type: str
+    # The encoded SSE message, shared by every subscriber
+    message: str
+
+    @property
+    def terminal(self) -> bool:
+        return self.type in TERMINAL_TYPES
+
+
+class Subscription:
+    """One subscriber's bounded queue of events for a topic.
+
+    When the subscriber falls behind and the queue is full, the oldest
+    event is dropped to make room, so a slow reader never holds up the
+    publisher or the other subscribers.
+    """
+
+    def __init__(self, bus: "EventBus", topic: Hashable, max_size: int) -> None:
+        self.bus = bus
+        self.topic = topic
+        self.dropped = 0
+        # Whether a terminal event has been queued
+        self.ended = False
+        self._queue: asyncio.Queue[Event] = asyncio.Queue(max_size)
+
+    def put(self, event: Event) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(event)
+        self.ended = self.ended or event.terminal
+
+    async def get(self) -> Event:
+        return await self._queue.get()
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+    async def __aiter__(self) -> AsyncIterator[Event]:
+        """Yield events up to and including the first terminal one."""
+        while True:
+            event = await self._queue.get()
+            yield event
+            if event.terminal:
+                return
+
+
+@dataclass
+class _Topic:
+    subscribers: set[Subscription] = field(default_factory=set)
+    history: deque[Event] = field(default_factory=deque)
+
+
+class EventBus:
+    """In-process publish/subscribe of events by topic.
+
+    Publishing encodes an event once, with an id increasing across all
+    topics, and appends the same object to each subscriber's queue and to
+    the topic's history of the last ``history_size`` events. The history
+    only covers the latest run of events: the first event after a
+    terminal one starts it over. A subscriber reconnecting with the id of
+    the last event it saw is sent the newer events from the history
+    first. Histories are kept for the ``max_topics`` most recently used
+    topics.
+
+    Must be used from the event loop.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = 100,
+        history_size: int = 100,
+        max_topics: int = 1000,
+    ) -> None:
+        self.max_queue_size = max_queue_size
+        self.history_size = history_size
+        self.max_topics = max_topics
+        self.last_id = 0
+        self._topics: OrderedDict[Hashable, _Topic] = OrderedDict()
+
+    def _topic(self, topic: Hashable) -> _Topic:
+        entry = self._topics.get(topic)
+        if entry is not None:
+            self._topics.move_to_end(topic)
+            return entry
+        entry = self._topics[topic] = _Topic(
+            history=deque(maxlen=self.history_size)
+        )
+        if len(self._topics) > self.max_topics:
+            # Forget the least recently used topic nobody follows
+            for key, other in self._topics.items():
+                if not other.subscribers:
+                    del self._topics[key]
+                    break
+        return entry
+
+    def subscribe(
+        self, topic: Hashable, last_event_id: str | None = None
+    ) -> Subscription:
+        """Follow ``topic``. With ``last_event_id``, first queue the events
+        published after it that are still in the topic's history; an id
+        the bus has not issued (malformed, or from before a restart) only
+        follows new events."""
+        entry = self._topic(topic)
+        subscription = Subscription(self, topic, self.max_queue_size)
+        entry.subscribers.add(subscription)
+        try:
+            after = int(last_event_id) if last_event_id is not None else None
+        except ValueError:
+            after = None
+        if after is not None and 0 < after <= self.last_id:
+            for event in entry.history:
+                if event.id > after:
+                    subscription.put(event)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        entry = self._topics.get(subscription.topic)
+        if entry is not None:
+            entry.subscribers.discard(subscription)
+
+    def subscriber_count(self, topic: Hashable) -> int:
+        entry = self._topics.get(topic)
+        return len(entry.subscribers) if entry else 0
+
+    def publish(self, topic: Hashable, type: str, **fields) -> Event:
+        """Send an event to the topic's subscribers as an SSE message with
+        JSON ``{"type": type, **fields}``."""
+        entry = self._topic(topic)
+        self.last_id += 1
+        data = json.dumps({"type": type, **fields}, default=str)
+        event = Event(self.last_id, type, f"id: {self.last_id}\ndata: {data}\n\n")
+        if entry.history and entry.history[-1].terminal:
+            # A new run; reconnecting must not replay the end of the last one
+            entry.history.clear()
+        entry.history.append(event)
+        for subscription in entry.subscribers:
+            subscription.put(event)
+        return event
+
+
+@dataclass
+class _Stream:
+    token: str
+    # What the stream is for, e.g. the route and client
+    key: Hashable
+    source: AsyncIterator[str]
+    # (number, message) of the last messages sent, numbered from 1
+    history: deque[tuple[int, str]]
+    sent: int = 0
+    done: bool = False
+    # Pulls the next message from the source; shared by the connections
+    pending: asyncio.Task | None = None
+    # The connection currently reading the stream
+    owner: object | None = None
+    consumers: int = 0
+    # Counts from creation too, as the response starts reading later
+    detached_at: float = field(default_factory=time.monotonic)
+
+
+class ResumableStreams:
+    """SSE streams that survive a dropped connection.
+
+    Each message gets the id ``<token>:<n>``. The source generator is
+    pulled from a task shielded from the connection, so when a client
+    disconnects the source is only suspended. A request carrying the last
+    id it saw in ``Last-Event-ID`` is sent the missed messages from the
+    stream's history of the last ``history_size`` ones, then continues
+    from the same source; the work behind the stream is not repeated.
+    Streams are resumed only by a request with the key they were started
+    with, so an id cannot pick up another route's or client's stream.
+    Suspended streams are closed after ``ttl`` seconds, or earlier when
+    more than ``max_streams`` are kept.
+    """
+
+    def __init__(
+        self, history_size: int = 100, max_streams: int = 1000, ttl: float = 300.0
+    ) -> None:
+        self.history_size = history_size
+        self.max_streams = max_streams
+        self.ttl = ttl
+        self._streams: OrderedDict[str, _Stream] = OrderedDict()
+
+    def resume(
+        self, key: Hashable, last_event_id: str | None
+    ) -> Response | None:
+        """Return the response continuing the stream ``last_event_id``
+        belongs to, or None if it is not known under ``key`` (start a new
+        stream)."""
+        self._expire()
+        if not last_event_id:
+            return None
+        token, _, number = last_event_id.partition(":")
+        stream = self._streams.get(token)
+        if stream is None or stream.key != key:
+            return None
+        try:
+            after = int(number)
+        except ValueError:
+            after = 0
+        if stream.done and after >= stream.sent:
+            # Nothing left; 204 tells EventSource not to reconnect again
+            return Response(status_code=204)
+        self._streams.move_to_end(token)
+        stream.detached_at = time.monotonic()
+        return StreamingResponse(
+            self._read(stream, after),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS,
+        )
+
+    def response(
+        self, key: Hashable, source: AsyncIterator[str]
+    ) -> StreamingResponse:
+        """Start streaming the SSE messages of ``source``; ``key`` is what
+        a request must pass to ``resume`` it."""
+        self._expire()
+        stream = _Stream(
+            uuid.uuid4().hex, key, source, deque(maxlen=self.history_size)
+        )
+        self._streams[stream.token] = stream
+        return StreamingResponse(
+            self._read(stream, 0),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS,
+        )
+
+    async def _pull(self, stream: _Stream) -> None:
+        try:
+            message = await stream.source.__anext__()
+        except StopAsyncIteration:
+            stream.done = True
+        except BaseException:
+            stream.done = True
+            raise
+        else:
+            stream.sent += 1
+            stream.history.append(
+                (stream.sent, f"id: {stream.token}:{stream.sent}\n{message}")
+            )
+        finally:
+            stream.pending = None
+
+    async def _read(self, stream: _Stream, after: int) -> AsyncIterator[str]:
+        owner = stream.owner = object()
+        stream.consumers += 1
+        try:
+            while True:
+                missed = stream.sent - after
+                if missed > 0:
+                    start = max(len(stream.history) - missed, 0)
+                    for number, message in list(
+                        itertools.islice(stream.history, start, None)
+                    ):
+                        yield message
+                        after = number
+                if stream.done or stream.owner is not owner:
+                    return
+                if stream.pending is None:
+                    stream.pending = asyncio.create_task(self._pull(stream))
+                # A disconnect cancels this request, not the pull
+                await asyncio.shield(stream.pending)
+        finally:
+            stream.consumers -= 1
+            stream.detached_at = time.monotonic()
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for token, stream in list(self._streams.items()):
+            if stream.consumers:
+                continue
+            expired = now - stream.detached_at > self.ttl
+            if not expired and len(self._streams) <= self.max_streams:
+                continue
+            del self._streams[token]
+            if stream.pending is not None:
+                stream.pending.cancel()
+            elif not stream.done:
+                asyncio.create_task(stream.source.aclose())
+
+
+@lru_cache()
+def get_event_bus() -> EventBus:
+    settings = get_settings()
+    return EventBus(
+        settings.EVENT_QUEUE_SIZE,
+        settings.EVENT_HISTORY_SIZE,
+        settings.EVENT_MAX_TOPICS,
+    )
+
+
+@lru_cache()
+def get_resumable_streams() -> ResumableStreams:
+    settings = get_settings()
+    return ResumableStreams(
+        settings.EVENT_HISTORY_SIZE,
+        settings.EVENT_MAX_TOPICS,
+        settings.SSE_RESUME_TTL,
+    )
@@ -0,0 +1,188 @@
+"""Blog post generation stages.
+
+The stage functions are CPU-bound and run in worker processes (see
+``app.stages``); they exchange JSON bytes and HTML strings rather than
+models.
+"""
+
+import json
+import re
+from html import escape, unescape
+from typing import TYPE_CHECKING, Callable
+
+from app.stages import StageTiming, get_stage_runner
+from app.utils import get_current_timestamp
+
+if TYPE_CHECKING:
+    from app.schemas.models import BlogIdeaRead
+
+BASE_LENGTH = 1200
+WORDS_PER_SECTION = 250
+MAX_LENGTH = 3000
+
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+_TAG_RE = re.compile(r"<[^>]*>")
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_SENTENCE_RE = re.compile(r"[.!?]+(?:\s|$)")
+
+_PARAGRAPHS = (
+    "Teams looking at {keyword} usually start from the same question: where "
+    "does the next unit of growth come from, and what does it cost?",
+    "A practical approach to {keyword} breaks the problem into steps that "
+    "can be measured, compared and improved one at a time.",
+    "The numbers behind {keyword} matter more than the tactics. Track the "
+    "inputs, the conversion rates between stages and the cost of each.",
+    "When {keyword} stalls, the cause is rarely a single channel. Review how "
+    "the stages hand off to each other before changing the budget.",
+)
+
+
+def _slug(text: str) -> str:
+    return _SLUG_RE.sub("-", text.lower()).strip("-")
+
+
+def _title(keyword: str) -> str:
+    return " ".join(word[:1].upper() + word[1:] for word in keyword.split())
+
+
+def build_brief(topic: str, keywords: bytes) -> bytes:
+    """Stage 1: outline the post around the keyword set.
+
+    ``keywords`` is JSON ``{"primary": str | None, "secondaries": [str]}``;
+    returns the brief as JSON.
+    """
+    data = json.loads(keywords)
+    primary = data.get("primary") or topic
+    secondaries = [k for k in data.get("secondaries", []) if k != primary]
+    outline = [{"heading": "Introduction", "keywords": [primary]}]
+    outline += [
+        {"heading": _title(k), "keywords": [k, primary]} for k in secondaries
+    ]
+    outline.append({"heading": "Conclusion", "keywords": [primary]})
+    brief = {
+        "title": topic,
+        "slug": _slug(topic),
+        "primary_keyword": primary,
+        "secondary_keywords": secondaries,
+        "target_length": min(
+            BASE_LENGTH + WORDS_PER_SECTION * len(secondaries), MAX_LENGTH
+        ),
+        "outline": outline,
+    }
+    return json.dumps(brief).encode()
+
+
+def render_draft(brief: bytes) -> str:
+    """Stage 2: write the draft HTML from the brief's outline, padding each
+    section up to its share of the target length."""
+    data = json.loads(brief)
+    outline = data["outline"]
+    per_section = data["target_length"] // max(len(outline), 1)
+    parts = [f"<article><h1>{escape(data['title'])}</h1>"]
+    for n, section in enumerate(outline):
+        parts.append(f"<h2>{escape(section['heading'])}</h2>")
+        words = 0
+        i = n
+        while words < per_section:
+            keyword = section["keywords"][i % len(section["keywords"])]
+            text = _PARAGRAPHS[i % len(_PARAGRAPHS)].format(keyword=keyword)
+            parts.append(f"<p>{escape(text)}</p>")
+            words += len(text.split())
+            i += 1
+    parts.append("</article>")
+    return "".join(parts)
+
+
+def score_draft(draft_html: str, brief: bytes) -> bytes:
+    """Stage 3: check the draft against the brief; returns the SEO report
+    as JSON with an overall ``score`` from 0 to 100."""
+    data = json.loads(brief)
+    text = unescape(_TAG_RE.sub(" ", draft_html)).lower()
+    words = _WORD_RE.findall(text)
+    sentences = max(len(_SENTENCE_RE.findall(text)), 1)
+    joined = " ".join(words)
+
+    def occurrences(keyword: str) -> int:
+        phrase = " ".join(_WORD_RE.findall(keyword.lower()))
+        return joined.count(phrase) if phrase else 0
+
+    primary = data["primary_keyword"]
+    primary_count = occurrences(primary)
+    density = 100.0 * primary_count * len(primary.split()) / max(len(words), 1)
+    secondaries = data["secondary_keywords"]
+    covered = [k for k in secondaries if occurrences(k)]
+    headings = draft_html.count("<h2>")
+    length_ratio = min(len(words) / data["target_length"], 1.0)
+    coverage = len(covered) / len(secondaries) if secondaries else 1.0
+    # Best between 0.5% and 2.5% keyword density
+    density_score = 1.0 if 0.5 <= density <= 2.5 else 0.5
+    words_per_sentence = len(words) / sentences
+    readability = 1.0 if words_per_sentence <= 20 else 20 / words_per_sentence
+    score = 100 * (
+        0.3 * length_ratio
+        + 0.3 * coverage
+        + 0.2 * density_score
+        + 0.2 * readability
+    )
+    report = {
+        "score": round(score),
+        "word_count": len(words),
+        "target_length": data["target_length"],
+        "headings": headings,
+        "primary_keyword_count": primary_count,
+        "primary_keyword_density": round(density, 2),
+        "secondary_keywords_covered": covered,
+        "words_per_sentence": round(words_per_sentence, 1),
+    }
+    return json.dumps(report).encode()
+
+
+async def generate_blog_post(
+    blog_idea: "BlogIdeaRead",
+    progress: Callable[[str], None] = lambda message: None,
+) -> list[StageTiming]:
+    """Run the generation stages for a blog idea and store the brief, draft
+    and SEO report on it; return the timing of each stage.
+
+    ``progress`` is called with a message as each stage starts.
+    """
+    from app.repository import get_repository
+
+    repo = get_repository()
+    runner = get_stage_runner()
+    keyword_set = None
+    if blog_idea.keyword_set_id is not None:
+        keyword_set = repo.get_keyword_set(
+            blog_idea.client_id, blog_idea.keyword_set_id
+        )
+    keywords = {"primary": None, "secondaries": []}
+    if keyword_set is not None:
+        keywords["primary"] = keyword_set.primary_keyword
+        keywords["secondaries"] = [
+            s["keyword"] for s in keyword_set.secondaries or [] if s.get("keyword")
+        ]
+
+    progress("Creating content brief...")
+    brief, brief_timing = await runner.run(
+        "brief", build_brief, blog_idea.topic, json.dumps(keywords).encode()
+    )
+    progress("Generating initial draft...")
+    draft_html, draft_timing = await runner.run("draft", render_draft, brief)
+    progress("Optimizing for SEO...")
+    report, seo_timing = await runner.run("seo", score_draft, draft_html, brief)
+
+    current = repo.get_blog_idea(blog_idea.client_id, blog_idea.id)
+    if current is not None:
+        await repo.save(
+            "blog_ideas",
+            current.model_copy(
+                update={
+                    "brief_json": json.loads(brief),
+                    "draft_html": draft_html,
+                    "latest_sq_report": json.loads(report),
+                    "iteration_count": (current.iteration_count or 0) + 1,
+                    "updated_at": get_current_timestamp(),
+                }
+            ),
+        )
+    return [brief_timing, draft_timing, seo_timing]
@@ -0,0 +1,71 @@
+import base64
+import binascii
+import json
+from bisect import bisect_right
+from typing import Any, Callable, Generic, Iterable, TypeVar
+
+T = TypeVar("T")
+
+SortKey = tuple
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+class SortedIndex(Generic[T]):
+    """Rows sorted by a key tuple, paged by keyset (seek) instead of offset.
+
+    A page starts right after the key of the last row on the previous page,
+    found with a binary search, so every page costs O(log n + limit) no
+    matter how deep into the result it is.
+    """
+
+    def __init__(self, rows: Iterable[T], key: Callable[[T], SortKey]) -> None:
+        pairs = sorted(((key(row), row) for row in rows), key=lambda p: p[0])
+        self.keys: list[SortKey] = [k for k, _ in pairs]
+        self.rows: list[T] = [row for _, row in pairs]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def template(self) -> SortKey | None:
+        """Any key of the index, for ``decode_cursor``."""
+        return self.keys[0] if self.keys else None
+
+    def page(
+        self, after: SortKey | None, limit: int
+    ) -> tuple[list[T], SortKey | None]:
+        """Return up to ``limit`` rows after ``after`` and the next key."""
+        start = 0 if after is None else bisect_right(self.keys, after)
+        end = start + limit
+        next_key = self.keys[end - 1] if end < len(self.keys) else None
+        return self.rows[start:end], next_key
+
+
+def encode_cursor(order: str, key: SortKey) -> str:
+    """Encode a sort key as an opaque, URL-safe cursor."""
+    raw = json.dumps([order, *key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order: str, template: SortKey) -> SortKey:
+    """Decode a cursor produced by ``encode_cursor`` for the same order.
+
+    ``template`` is any key of the index; the decoded key must have the
+    same length and element types.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values: list[Any] = json.loads(raw)
+    except (binascii.Error, ValueError) as e:
+        raise InvalidCursor("Malformed cursor") from e
+    if not isinstance(values, list) or not values or values[0] != order:
+        raise InvalidCursor("Cursor does not belong to this sort order")
+    key = tuple(values[1:])
+    if len(key) != len(template) or any(
+        type(a) is not type(b) for a, b in zip(key, template)
+    ):
+        raise InvalidCursor("Cursor does not match this sort order")
+    return key
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+from app.config import get_settings
+from app.events import EventBus, get_event_bus
+from app.generation import generate_blog_post
+from app.schemas.models import BlogIdeaJobRead, BlogIdeaRead
+from app.stages import StageTiming
+from app.utils import get_current_timestamp
+
+if TYPE_CHECKING:
+    from app.repository import Repository
+
+logger = logging.getLogger(__name__)
+
+# Blog idea states, in the order a job moves through them
+UNQUEUED = "unqueued"
+QUEUED = "queued"
+IN_PROGRESS = "in_progress"
+COMPLETE = "complete"
+ERROR = "error"
+ACTIVE_STATES = (QUEUED, IN_PROGRESS)
+
+# Processes one blog idea, reporting progress messages through the
+# callback, and returns the timing of each stage
+Processor = Callable[
+    [BlogIdeaRead, Callable[[str], None]], Awaitable[list[StageTiming]]
+]
+
+
+class QueueFull(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    client_id: int
+    blog_idea_id: int
+    state: str
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    error_message: str | None = None
+    stages: list[StageTiming] = field(default_factory=list)
+
+    def read(self) -> BlogIdeaJobRead:
+        return BlogIdeaJobRead(**asdict(self))
+
+
+class BlogIdeaQueue:
+    """Queue of blog ideas to process, drained by a fixed pool of asyncio
+    workers.
+
+    Enqueueing stores the idea as ``queued`` and returns at once; a worker
+    later moves it to ``in_progress`` and then ``complete`` or ``error``,
+    storing each state on the blog idea. At most one job per blog idea is
+    queued or running at a time, and at most ``max_size`` jobs overall
+    (0 for no limit).
+
+    Progress of each job is published on ``events`` under the topic
+    ``(client_id, blog_idea_id)``, ending with a ``complete`` or ``error``
+    event.
+    """
+
+    def __init__(
+        self,
+        repo: "Repository",
+        workers: int,
+        max_size: int = 0,
+        history: int = 1000,
+        processor: Processor = generate_blog_post,
+        events: EventBus | None = None,
+    ) -> None:
+        self.repo = repo
+        self.workers = workers
+        self.max_size = max_size
+        self.history = history
+        self.processor = processor
+        self.events = events or EventBus()
+        self._queue: asyncio.Queue[Job] | None = None
+        self._tasks: list[asyncio.Task] = []
+        # job id -> job, oldest first; finished jobs beyond ``history`` are
+        # dropped
+        self._jobs: dict[str, Job] = {}
+        self._active: dict[tuple[int, int], Job] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Start the workers and requeue ideas left queued or in progress
+        by a previous run."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"blog-idea-worker-{n}")
+            for n in range(self.workers)
+        ]
+        for client in self.repo.list_clients():
+            for blog_idea in self.repo.list_blog_ideas(client.id):
+                if blog_idea.state in ACTIVE_STATES:
+                    try:
+                        await self.enqueue(blog_idea)
+                    except QueueFull:
+                        logger.warning("Blog idea queue is full, not requeued")
+                        return
+
+    async def stop(self) -> None:
+        """Cancel the workers; ideas still queued stay ``queued`` and are
+        picked up again by the next ``start``."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._active.clear()
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def active_job(self, client_id: int, blog_idea_id: int) -> Job | None:
+        return self._active.get((client_id, blog_idea_id))
+
+    async def enqueue(self, blog_idea: BlogIdeaRead) -> Job:
+        """Queue a blog idea, or return its job if it already has one."""
+        key = (blog_idea.client_id, blog_idea.id)
+        job = self._active.get(key)
+        if job is not None:
+            return job
+        if self._queue is None:
+            raise RuntimeError("Blog idea queue is not running")
+        if self.max_size and len(self._active) >= self.max_size:
+            raise QueueFull()
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            client_id=blog_idea.client_id,
+            blog_idea_id=blog_idea.id,
+            state=QUEUED,
+            created_at=get_current_timestamp(),
+        )
+        # Registered before the save, so a second request for the idea
+        # gets this job instead of starting another
+        self._active[key] = job
+        self._remember(job)
+        if blog_idea.state != QUEUED:
+            try:
+                await self._set_state(job, QUEUED)
+            except BaseException:
+                self._active.pop(key, None)
+                self._jobs.pop(job.id, None)
+                raise
+        self._queue.put_nowait(job)
+        return job
+
+    def _remember(self, job: Job) -> None:
+        self._jobs[job.id] = job
+        if len(self._jobs) > self.history:
+            for job_id in list(self._jobs):
+                if len(self._jobs) <= self.history:
+                    break
+                if self._jobs[job_id].state not in ACTIVE_STATES:
+                    del self._jobs[job_id]
+
+    async def _set_state(
+        self, job: Job, state: str, error_message: str | None = None
+    ) -> BlogIdeaRead | None:
+        """Store ``state`` on the job and its blog idea; return the idea, or
+        None if it was deleted meanwhile."""
+        job.state = state
+        job.error_message = error_message
+        blog_idea = self.repo.get_blog_idea(job.client_id, job.blog_idea_id)
+        if blog_idea is None:
+            return None
+        return await self.repo.save(
+            "blog_ideas",
+            blog_idea.model_copy(
+                update={
+                    "state": state,
+                    "error_message": error_message,
+                    "updated_at": get_current_timestamp(),
+                }
+            ),
+        )
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Outside the processor, e.g. a failed save: end the job
+                # without touching the store, so followers are released
+                logger.exception("Blog idea job %s failed", job.id)
+                job.state, job.error_message = ERROR, str(e)
+                job.finished_at = get_current_timestamp()
+                self._publish_result(job, None)
+            finally:
+                self._active.pop((job.client_id, job.blog_idea_id), None)
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        topic = (job.client_id, job.blog_idea_id)
+        step = 0
+
+        def progress(message: str) -> None:
+            nonlocal step
+            step += 1
+            self.events.publish(
+                topic, "progress", message=message, step=step, job_id=job.id
+            )
+
+        job.started_at = get_current_timestamp()
+        blog_idea = await self._set_state(job, IN_PROGRESS)
+        if blog_idea is None:
+            job.state, job.error_message = ERROR, "Blog idea was deleted"
+            job.finished_at = get_current_timestamp()
+            self._publish_result(job, None)
+            return
+        progress("Initializing blog post generation...")
+        try:
+            job.stages = await self.processor(blog_idea, progress)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Processing blog idea %s failed", job.blog_idea_id)
+            blog_idea = await self._set_state(job, ERROR, str(e))
+        else:
+            progress("Finalizing blog post...")
+            blog_idea = await self._set_state(job, COMPLETE)
+        job.finished_at = get_current_timestamp()
+        self._publish_result(job, blog_idea)
+
+    def _publish_result(self, job: Job, blog_idea: BlogIdeaRead | None) -> None:
+        data = {
+            "blog_idea_id": job.blog_idea_id,
+            "job_id": job.id,
+            "state": job.state,
+        }
+        if job.state == COMPLETE:
+            data["final_version_number"] = (
+                blog_idea.iteration_count if blog_idea else None
+            )
+            data["stages"] = [asdict(s) for s in job.stages]
+        else:
+            data["error_message"] = job.error_message
+        self.events.publish(
+            (job.client_id, job.blog_idea_id), job.state, data=data
+        )
+
+
+@lru_cache()
+def get_blog_idea_queue() -> BlogIdeaQueue:
+    from app.repository import get_repository
+
+    settings = get_settings()
+    return BlogIdeaQueue(
+        get_repository(),
+        workers=settings.BLOG_IDEA_WORKERS,
+        max_size=settings.BLOG_IDEA_QUEUE_SIZE,
+        history=settings.BLOG_IDEA_JOB_HISTORY,
+        events=get_event_bus(),
+    )
@@ -0,0 +1,172 @@
+import asyncio
+from typing import TYPE_CHECKING, Sequence
+
+import numpy as np
+
+from app.clustering import ClusterEngine, get_clustering_service, normalize_keyword
+from app.metrics import get_metrics_provider
+from app.schemas.models import KeywordIdeaRead, KeywordSetRead
+from app.scoring import score_values
+from app.similarity import SimilarityIndex, get_similarity_index, opportunity
+from app.utils import get_current_timestamp
+
+if TYPE_CHECKING:
+    from app.repository import Repository
+
+MAX_SECONDARIES = 5
+# Lowest TF-IDF similarity for a neighbour to become a secondary
+SECONDARY_SIM_THRESHOLD = 0.3
+
+
+def _secondary(idea: KeywordIdeaRead, kind: str) -> dict:
+    return {
+        "keyword": idea.keyword,
+        "sv": idea.search_volume,
+        "kd": idea.keyword_difficulty,
+        "type": kind,
+    }
+
+
+def group_keywords(
+    selected: Sequence[KeywordIdeaRead],
+    clusters: ClusterEngine,
+    similarity: SimilarityIndex,
+) -> list[tuple[list[KeywordIdeaRead], list[int], list[int]]]:
+    """Group the selected keywords by cluster.
+
+    Returns, per group, its selected keywords with the best opportunity
+    (volume per point of difficulty) first, the ids of the rest of the
+    cluster, and the ids of the primary's nearest TF-IDF neighbours.
+    """
+    members = clusters.cluster_members()
+    scores = dict(zip((k.id for k in selected), opportunity(selected)))
+    groups: dict[int, list[KeywordIdeaRead]] = {}
+    for idea in sorted(selected, key=lambda k: (-scores[k.id], k.id)):
+        # Key each group by the smallest id of its cluster
+        groups.setdefault(min(members.get(idea.id, [idea.id])), []).append(idea)
+
+    neighbours = similarity.similar(
+        [group[0].id for group in groups.values()],
+        SECONDARY_SIM_THRESHOLD,
+        MAX_SECONDARIES,
+    )
+    result = []
+    for group in groups.values():
+        primary = group[0]
+        in_group = {k.id for k in group}
+        cluster = [i for i in members.get(primary.id, []) if i not in in_group]
+        similar = [m.keyword_id for m in neighbours.get(primary.id, [])]
+        result.append((group, cluster, similar))
+    return result
+
+
+def build_keyword_sets(
+    groups: list[tuple[list[KeywordIdeaRead], list[int], list[int]]],
+    pool: dict[int, KeywordIdeaRead],
+) -> list[tuple[KeywordIdeaRead, list[dict]]]:
+    """Turn the groups of ``group_keywords`` into sets of a primary and
+    secondaries.
+
+    Secondaries are, in this order, the other selected keywords of the
+    group ("selected"), the rest of the cluster ("cluster") and the
+    primary's nearest TF-IDF neighbours ("similar"), best opportunity
+    first within each type, skipping variants of keywords already in the
+    set. ``pool`` holds the cluster and neighbour keywords by id; ids
+    missing from it are skipped. The result depends only on the inputs.
+    """
+
+    def by_opportunity(ideas: list[KeywordIdeaRead]) -> list[KeywordIdeaRead]:
+        ranked = dict(zip((k.id for k in ideas), opportunity(ideas)))
+        return sorted(ideas, key=lambda k: (-ranked[k.id], k.id))
+
+    sets = []
+    for group, cluster_ids, similar_ids in groups:
+        primary = group[0]
+        seen = {normalize_keyword(primary.keyword)}
+        secondaries: list[dict] = []
+        cluster = [pool[i] for i in cluster_ids if i in pool]
+        candidates = (
+            [(k, "selected") for k in group[1:]]
+            + [(k, "cluster") for k in by_opportunity(cluster)]
+            + [(pool[i], "similar") for i in similar_ids if i in pool]
+        )
+        for idea, kind in candidates:
+            if len(secondaries) >= MAX_SECONDARIES:
+                break
+            key = normalize_keyword(idea.keyword)
+            if key in seen:
+                continue
+            seen.add(key)
+            secondaries.append(_secondary(idea, kind))
+        sets.append((primary, secondaries))
+    return sets
+
+
+async def develop_keyword_sets(
+    repo: "Repository",
+    client_id: int,
+    selected: Sequence[KeywordIdeaRead],
+) -> list[KeywordSetRead]:
+    """Build keyword sets from the selected ideas and store them.
+
+    ``selected`` should carry the metrics provider's numbers; those of the
+    secondaries are looked up here. A set whose primary keyword matches a
+    stored set keeps that set's id and intent. ``primary_quality`` is the
+    primary's quality score.
+    """
+    clusters = await get_clustering_service().engine(repo, client_id)
+    similarity = await get_similarity_index(repo, client_id)
+    groups = await asyncio.to_thread(group_keywords, selected, clusters, similarity)
+    # Build models only for the cluster members and neighbours in the sets
+    wanted = {i for _, cluster, similar in groups for i in cluster + similar}
+    pool = {
+        idea.id: idea
+        for idea in repo.keyword_columns(client_id).lookup(
+            np.fromiter(wanted, np.int64, len(wanted))
+        )
+    }
+    built = await asyncio.to_thread(build_keyword_sets, groups, pool)
+    # Report the metrics provider's numbers for the secondaries too
+    metrics = await get_metrics_provider().get_many(
+        s["keyword"] for _, secondaries in built for s in secondaries
+    )
+    for _, secondaries in built:
+        for secondary in secondaries:
+            m = metrics[secondary["keyword"]]
+            if m is not None:
+                secondary["sv"] = m.search_volume
+                secondary["kd"] = m.keyword_difficulty
+
+    existing = {
+        normalize_keyword(s.primary_keyword): s
+        for s in repo.list_keyword_sets(client_id)
+    }
+    now = get_current_timestamp()
+    previous = [existing.pop(normalize_keyword(p.keyword), None) for p, _ in built]
+    intents = [old.primary_intent if old else None for old in previous]
+    qualities = score_values(
+        [p.search_volume for p, _ in built],
+        [p.keyword_difficulty for p, _ in built],
+        intents,
+    )
+    sets = []
+    for (primary, secondaries), old, intent, quality in zip(
+        built, previous, intents, qualities
+    ):
+        sets.append(
+            KeywordSetRead(
+                id=old.id if old else repo.allocate_id("keyword_sets", client_id),
+                client_id=client_id,
+                primary_keyword=primary.keyword,
+                primary_search_volume=primary.search_volume,
+                primary_keyword_difficulty=primary.keyword_difficulty,
+                primary_intent=intent,
+                primary_quality=quality,
+                secondaries=secondaries,
+                created_at=old.created_at if old else now,
+                updated_at=now,
+            )
+        )
+    if sets:
+        await repo.save_many("keyword_sets", sets)
+    return sets
@@ -1,9 +1,16 @@
+import asyncio
 import logging
 import sys
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from app.api import blog_ideas, blog_posts, client, client_context, keywords
+from app.api import blog_ideas, blog_posts, client, client_context, keywords, search
+from app.artifacts import get_artifact_cache
+from app.cache import get_response_cache
+from app.jobs import get_blog_idea_queue
+from app.repository import get_repository
+from app.stages import get_stage_runner
 
 # Configure logging
 logging.basicConfig(
@@ -15,7 +22,21 @@ logging.basicConfig(
 # Set log levels for our modules
 logging.getLogger("app").setLevel(logging.INFO)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the database and build the in-memory index off the event loop
+    repo = await asyncio.to_thread(get_repository)
+    get_stage_runner().start()
+    queue = get_blog_idea_queue()
+    await queue.start()
+    yield
+    await queue.stop()
+    get_stage_runner().shutdown()
+    repo.store.pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Include routers
 app.include_router(client.router, prefix="/clients", tags=["clients"])
@@ -33,6 +54,7 @@ app.include_router(
     tags=["blog-ideas"],
 )
 app.include_router(blog_posts.router, prefix="/blog-posts", tags=["blog-posts"])
+app.include_router(search.router, prefix="/search", tags=["search"])
 
 
 @app.get("/")
@@ -44,3 +66,10 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+
+@app.get("/stats")
+async def stats():
+    return {
+        "artifact_cache": get_artifact_cache().stats(),
+        "response_cache": get_response_cache().stats(),
+    }
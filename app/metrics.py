@@ -0,0 +1,214 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterable, Protocol, Sequence
+
+from app.config import get_settings
+from app.schemas.models import KeywordIdeaRead
+
+if TYPE_CHECKING:
+    from app.repository import Repository
+
+
+@dataclass(frozen=True)
+class KeywordMetrics:
+    search_volume: int | None
+    keyword_difficulty: int | None
+
+
+def metrics_key(keyword: str) -> str:
+    """Keywords are looked up case- and whitespace-insensitively."""
+    return " ".join(keyword.lower().split())
+
+
+class MetricsBackend(Protocol):
+    async def fetch(self, keywords: list[str]) -> dict[str, KeywordMetrics]:
+        """Return the metrics of the keywords the backend knows, keyed by
+        ``metrics_key``."""
+        ...
+
+
+class LocalMetricsBackend:
+    """Stand-in for the metrics API.
+
+    Answers from the metrics stored on the keyword ideas of all clients,
+    after ``latency`` seconds per call, and counts calls and keywords so
+    batching can be observed.
+    """
+
+    def __init__(self, repo: "Repository", latency: float = 0.0) -> None:
+        self.repo = repo
+        self.latency = latency
+        self.calls = 0
+        self.keywords_fetched = 0
+
+    async def _known(self, client_id: int) -> dict[str, KeywordMetrics]:
+        def snapshot() -> tuple:
+            columns = self.repo.keyword_columns(client_id)
+            positions = columns.positions()
+            return (columns.keywords(positions), *columns.metrics(positions))
+
+        def build(data: tuple) -> dict[str, KeywordMetrics]:
+            keywords, volume, has_volume, difficulty, has_difficulty = data
+            return {
+                metrics_key(keyword): KeywordMetrics(
+                    sv if has_sv else None, kd if has_kd else None
+                )
+                for keyword, sv, has_sv, kd, has_kd in zip(
+                    keywords,
+                    volume.tolist(),
+                    has_volume.tolist(),
+                    difficulty.tolist(),
+                    has_difficulty.tolist(),
+                )
+            }
+
+        return await self.repo.aderived_index(
+            "metrics", "keyword_ideas", client_id, snapshot, build
+        )
+
+    async def fetch(self, keywords: list[str]) -> dict[str, KeywordMetrics]:
+        self.calls += 1
+        self.keywords_fetched += len(keywords)
+        await asyncio.sleep(self.latency)
+        found: dict[str, KeywordMetrics] = {}
+        missing = list(dict.fromkeys(keywords))
+        # The first client that knows a keyword answers for it
+        for client in self.repo.list_clients():
+            known = await self._known(client.id)
+            for key in missing:
+                metrics = known.get(key)
+                if metrics is not None:
+                    found[key] = metrics
+            missing = [key for key in missing if key not in found]
+            if not missing:
+                break
+        return found
+
+
+class MetricsProvider:
+    """Looks up keyword metrics through a ``MetricsBackend``.
+
+    Lookups from concurrent callers are queued and sent to the backend in
+    batches of at most ``max_batch_size`` keywords, at the latest
+    ``max_wait`` seconds after the first one was queued. A keyword already
+    queued or being fetched is not requested again; its callers share the
+    result. Results, including keywords the backend does not know, are
+    cached for ``ttl`` seconds, keeping at most ``max_entries`` keywords.
+    """
+
+    def __init__(
+        self,
+        backend: MetricsBackend,
+        max_batch_size: int = 100,
+        max_wait: float = 0.01,
+        ttl: float = 3600.0,
+        max_entries: int = 100_000,
+    ) -> None:
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (expiry, metrics), oldest first
+        self._cache: dict[str, tuple[float, KeywordMetrics | None]] = {}
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._queued: list[str] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def get_many(
+        self, keywords: Iterable[str]
+    ) -> dict[str, KeywordMetrics | None]:
+        """Return the metrics of each keyword, or None if it is unknown."""
+        keys = {keyword: metrics_key(keyword) for keyword in keywords}
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        results: dict[str, KeywordMetrics | None] = {}
+        waiting: dict[str, asyncio.Future] = {}
+        for key in dict.fromkeys(keys.values()):
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > now:
+                results[key] = cached[1]
+                continue
+            future = self._in_flight.get(key)
+            if future is None:
+                future = self._in_flight[key] = loop.create_future()
+                self._queued.append(key)
+            waiting[key] = future
+
+        if len(self._queued) >= self.max_batch_size:
+            self._flush()
+        elif self._queued and self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        for key, future in waiting.items():
+            # Shielded: one caller giving up must not cancel the others
+            results[key] = await asyncio.shield(future)
+        return {keyword: results[key] for keyword, key in keys.items()}
+
+    async def apply(self, ideas: Sequence[KeywordIdeaRead]) -> list[KeywordIdeaRead]:
+        """Return the ideas with the provider's metrics; ideas the provider
+        knows nothing about keep their stored metrics."""
+        metrics = await self.get_many(idea.keyword for idea in ideas)
+        return [
+            idea
+            if (m := metrics[idea.keyword]) is None
+            else idea.model_copy(
+                update={
+                    "search_volume": m.search_volume,
+                    "keyword_difficulty": m.keyword_difficulty,
+                }
+            )
+            for idea in ideas
+        ]
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        queued, self._queued = self._queued, []
+        for start in range(0, len(queued), self.max_batch_size):
+            task = asyncio.create_task(
+                self._fetch(queued[start : start + self.max_batch_size])
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, keys: list[str]) -> None:
+        try:
+            found = await self.backend.fetch(keys)
+        except Exception as e:
+            for key in keys:
+                future = self._in_flight.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        expiry = time.monotonic() + self.ttl
+        for key in keys:
+            metrics = found.get(key)
+            self._cache.pop(key, None)
+            self._cache[key] = (expiry, metrics)
+            future = self._in_flight.pop(key)
+            if not future.done():
+                future.set_result(metrics)
+        while len(self._cache) > self.max_entries:
+            del self._cache[next(iter(self._cache))]
+
+
+@lru_cache()
+def get_metrics_provider() -> MetricsProvider:
+    from app.repository import get_repository
+
+    settings = get_settings()
+    if settings.METRICS_BACKEND != "local":
+        raise ValueError(f"Unknown metrics backend: {settings.METRICS_BACKEND}")
+    backend = LocalMetricsBackend(get_repository(), settings.METRICS_LOCAL_LATENCY)
+    return MetricsProvider(
+        backend,
+        max_batch_size=settings.METRICS_MAX_BATCH_SIZE,
+        max_wait=settings.METRICS_MAX_WAIT,
+        ttl=settings.METRICS_CACHE_TTL,
+        max_entries=settings.METRICS_CACHE_MAX_ENTRIES,
+    )
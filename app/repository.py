@@ -0,0 +1,402 @@
+import asyncio
+import os
+from functools import lru_cache
+from typing import Any, Callable, Sequence
+
+from pydantic import BaseModel
+
+from app.config import get_settings
+from app.db import TABLES, Store, open_store, row_key
+from app.columns import KeywordColumns, SortedColumnsView
+from app.indexes import SortedIndex
+from app.schemas.models import (
+    BestAlternateRead,
+    BlogIdeaRead,
+    BlogPostArtifactRead,
+    ClientContextRead,
+    ClientRead,
+    KeywordClusterRead,
+    KeywordIdeaRead,
+    KeywordSetRead,
+)
+
+# Tables whose rows are kept as {client_id: {id: model}}. Keyword ideas are
+# kept in KeywordColumns instead.
+_PER_CLIENT_TABLES = (
+    "keyword_clusters",
+    "keyword_sets",
+    "best_alternates",
+    "blog_ideas",
+    "html_artifacts",
+)
+# Called as listener(table, client_id, saved, deleted_ids); deleted_ids is
+# None when every row of the client was deleted.
+RowListener = Callable[[str, int, Sequence[BaseModel], Sequence[int] | None], None]
+
+# Tables whose ids are unique across clients rather than per client.
+_GLOBAL_ID_TABLES = ("clients", "blog_post_artifacts")
+
+
+def _volume(search_volume: int | None) -> int:
+    # Rows without a volume sort after rows with volume 0
+    return -1 if search_volume is None else search_volume
+
+
+# Sort keys for keyset pagination, per (table, order). Every key ends with
+# the row id so the order is total and stable.
+SORT_KEYS: dict[tuple[str, str], Callable[[BaseModel], tuple]] = {
+    ("keyword_ideas", "volume"): lambda k: (-_volume(k.search_volume), k.id),
+    ("keyword_ideas", "keyword"): lambda k: (k.keyword.lower(), k.id),
+    ("keyword_sets", "volume"): lambda s: (-_volume(s.primary_search_volume), s.id),
+    ("keyword_sets", "keyword"): lambda s: (s.primary_keyword.lower(), s.id),
+    ("keyword_clusters", "volume"): lambda c: (
+        -sum(k.search_volume or 0 for k in c.keywords or []),
+        c.id,
+    ),
+    ("keyword_clusters", "keyword"): lambda c: (c.label.lower(), c.id),
+}
+
+
+class Repository:
+    """In-memory index over the persistent store.
+
+    Every entity is loaded once and kept in dicts keyed by id and client_id,
+    so reads are O(1) and never touch the database. Writes go to the store
+    on a worker thread first and are then applied to the in-memory index.
+    """
+
+    def __init__(self, store: Store) -> None:
+        self.store = store
+        self._clients: dict[int, ClientRead] = {}
+        self._client_contexts: dict[int, ClientContextRead] = {}
+        self._rows: dict[str, dict[int, dict[int, BaseModel]]] = {
+            table: {} for table in _PER_CLIENT_TABLES
+        }
+        self._keyword_ideas: dict[int, KeywordColumns] = {}
+        self._blog_post_artifacts: dict[int, BlogPostArtifactRead] = {}
+        self._blog_post_artifacts_by_idea: dict[
+            tuple[int, int], BlogPostArtifactRead
+        ] = {}
+        self._best_alternates_by_keyword: dict[
+            tuple[int, int], BestAlternateRead
+        ] = {}
+        self._next_ids: dict[tuple[str, int | None], int] = {}
+        self._listeners: list[Callable[[str, int], None]] = []
+        self._row_listeners: list[RowListener] = []
+        # Version stamps per (table, client_id) and per table (client_id
+        # None), bumped on every write. The epoch makes stamps from a
+        # previous process distinguishable after a restart.
+        self._versions: dict[tuple[str, int | None], int] = {}
+        self._epoch = os.urandom(4).hex()
+        # Derived indexes, each stored with the version it was built from
+        self._derived: dict[tuple, tuple[int, object]] = {}
+        # Derived indexes being built on a worker thread, with their version
+        self._building: dict[tuple, tuple[int, asyncio.Future]] = {}
+
+    @classmethod
+    def from_store(cls, store: Store) -> "Repository":
+        """Build a repository from everything currently in ``store``."""
+        repo = cls(store)
+        for table in TABLES:
+            for model in store.load(table):
+                repo._index(table, model)
+        return repo
+
+    def _index(self, table: str, model: BaseModel) -> None:
+        if table == "clients":
+            self._clients[model.id] = model
+        elif table == "client_contexts":
+            self._client_contexts[model.client_id] = model
+        elif table == "keyword_ideas":
+            columns = self._keyword_ideas.get(model.client_id)
+            if columns is None:
+                columns = self._keyword_ideas[model.client_id] = KeywordColumns(
+                    model.client_id
+                )
+            columns.upsert(model)
+        elif table == "blog_post_artifacts":
+            self._blog_post_artifacts[model.id] = model
+            if model.blog_idea_id is not None:
+                key = (model.client_id, model.blog_idea_id)
+                self._blog_post_artifacts_by_idea[key] = model
+        else:
+            rows = self._rows[table].setdefault(model.client_id, {})
+            if table == "best_alternates":
+                self._unindex_best_alternate(rows.get(model.id))
+                key = (model.client_id, model.original_keyword_id)
+                self._best_alternates_by_keyword[key] = model
+            rows[model.id] = model
+        scope = None if table in _GLOBAL_ID_TABLES else row_key(model)[0]
+        key = (table, scope)
+        self._next_ids[key] = max(self._next_ids.get(key, 1), model.id + 1)
+
+    def _unindex(self, table: str, client_id: int, row_id: int) -> None:
+        if table == "clients":
+            self._clients.pop(row_id, None)
+        elif table == "client_contexts":
+            self._client_contexts.pop(client_id, None)
+        elif table == "keyword_ideas":
+            if client_id in self._keyword_ideas:
+                self._keyword_ideas[client_id].delete(row_id)
+        elif table == "blog_post_artifacts":
+            model = self._blog_post_artifacts.pop(row_id, None)
+            if model and model.blog_idea_id is not None:
+                self._blog_post_artifacts_by_idea.pop(
+                    (model.client_id, model.blog_idea_id), None
+                )
+        else:
+            model = self._rows[table].get(client_id, {}).pop(row_id, None)
+            if table == "best_alternates":
+                self._unindex_best_alternate(model)
+
+    def _unindex_best_alternate(self, model: BestAlternateRead | None) -> None:
+        if model is None:
+            return
+        key = (model.client_id, model.original_keyword_id)
+        if self._best_alternates_by_keyword.get(key) is model:
+            del self._best_alternates_by_keyword[key]
+
+    def subscribe(self, listener: Callable[[str, int], None]) -> None:
+        """Call ``listener(table, client_id)`` after every write."""
+        self._listeners.append(listener)
+
+    def subscribe_rows(self, listener: RowListener) -> None:
+        """Call ``listener(table, client_id, saved, deleted_ids)`` with the
+        rows of every write, before the ``subscribe`` listeners run."""
+        self._row_listeners.append(listener)
+
+    def _notify_rows(
+        self,
+        table: str,
+        client_id: int,
+        saved: Sequence[BaseModel] = (),
+        deleted: Sequence[int] | None = (),
+    ) -> None:
+        for listener in self._row_listeners:
+            listener(table, client_id, saved, deleted)
+
+    def _notify(self, table: str, client_id: int) -> None:
+        for scope in ((table, client_id), (table, None)):
+            self._versions[scope] = self._versions.get(scope, 0) + 1
+        for listener in self._listeners:
+            listener(table, client_id)
+
+    def version(self, table: str, client_id: int | None = None) -> int:
+        """Return the write counter for a table, optionally per client."""
+        return self._versions.get((table, client_id), 0)
+
+    def etag(self, *scopes: tuple[str, int | None], extra: str = "") -> str:
+        """Build a strong ETag from the version stamps of ``scopes``."""
+        stamps = ".".join(str(self.version(*scope)) for scope in scopes)
+        suffix = f"-{extra}" if extra else ""
+        return f'"{self._epoch}-{stamps}{suffix}"'
+
+    def allocate_id(self, table: str, client_id: int | None = None) -> int:
+        """Reserve the next id for ``table`` (scoped per client if given)."""
+        key = (table, client_id)
+        next_id = self._next_ids.get(key, 1)
+        self._next_ids[key] = next_id + 1
+        return next_id
+
+    # Writes
+    async def save(self, table: str, model: BaseModel) -> BaseModel:
+        """Insert or replace a row in the store and the index."""
+        await self.store.aupsert(table, model)
+        self._index(table, model)
+        self._notify_rows(table, row_key(model)[0], [model])
+        self._notify(table, row_key(model)[0])
+        return model
+
+    async def save_many(self, table: str, models: list[BaseModel]) -> list[BaseModel]:
+        """Insert or replace several rows of ``table`` in one transaction."""
+        await self.store.aupsert_many([(table, model) for model in models])
+        by_client: dict[int, list[BaseModel]] = {}
+        for model in models:
+            self._index(table, model)
+            by_client.setdefault(row_key(model)[0], []).append(model)
+        for client_id, saved in by_client.items():
+            self._notify_rows(table, client_id, saved)
+            self._notify(table, client_id)
+        return models
+
+    async def delete(self, table: str, client_id: int, row_id: int) -> None:
+        await self.store.adelete(table, client_id, row_id)
+        self._unindex(table, client_id, row_id)
+        self._notify_rows(table, client_id, deleted=[row_id])
+        self._notify(table, client_id)
+
+    async def delete_client(self, client_id: int) -> None:
+        """Delete a client and every row that belongs to it."""
+        await self.store.adelete_client(client_id)
+        self._clients.pop(client_id, None)
+        self._client_contexts.pop(client_id, None)
+        self._keyword_ideas.pop(client_id, None)
+        for rows in self._rows.values():
+            rows.pop(client_id, None)
+        for key in [k for k in self._best_alternates_by_keyword if k[0] == client_id]:
+            del self._best_alternates_by_keyword[key]
+        for artifact in list(self._blog_post_artifacts.values()):
+            if artifact.client_id == client_id:
+                self._unindex("blog_post_artifacts", client_id, artifact.id)
+        for key in [k for k in self._derived if k[2] == client_id]:
+            del self._derived[key]
+        for table in TABLES:
+            self._notify_rows(table, client_id, deleted=None)
+            self._notify(table, client_id)
+
+    def derived_index(
+        self, kind: str, table: str, client_id: int, build: Callable[[], object]
+    ):
+        """Return a cached index over one client's rows of ``table``.
+
+        It is built on first use and rebuilt only after a write to the same
+        table and client.
+        """
+        key = (kind, table, client_id)
+        version = self.version(table, client_id)
+        cached = self._derived.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        index = build()
+        self._derived[key] = (version, index)
+        return index
+
+    async def aderived_index(
+        self,
+        kind: str,
+        table: str,
+        client_id: int,
+        snapshot: Callable[[], Any],
+        build: Callable[[Any], object],
+    ):
+        """Like ``derived_index``, but build the index on a worker thread.
+
+        The version is read and ``snapshot()`` taken on the event loop, so
+        the data matches the version the index is cached under; only
+        ``build(data)`` runs on the thread. Concurrent callers share one
+        build, and an index whose rows changed while it was being built is
+        returned but not cached.
+        """
+        key = (kind, table, client_id)
+        version = self.version(table, client_id)
+        cached = self._derived.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        building = self._building.get(key)
+        if building is None or building[0] != version:
+            task = asyncio.ensure_future(asyncio.to_thread(build, snapshot()))
+
+            def store(task: asyncio.Future) -> None:
+                if self._building.get(key, (None, None))[1] is task:
+                    del self._building[key]
+                if (
+                    not task.cancelled()
+                    and task.exception() is None
+                    and self.version(table, client_id) == version
+                ):
+                    self._derived[key] = (version, task.result())
+
+            task.add_done_callback(store)
+            building = self._building[key] = (version, task)
+        return await asyncio.shield(building[1])
+
+    def sorted_index(
+        self, table: str, client_id: int, order: str
+    ) -> SortedIndex | SortedColumnsView:
+        """Return the rows of a client sorted by ``SORT_KEYS[table, order]``."""
+        if table == "keyword_ideas":
+            return self.keyword_columns(client_id).sorted_view(order)
+        return self.derived_index(
+            f"sorted:{order}",
+            table,
+            client_id,
+            lambda: SortedIndex(
+                self._rows[table].get(client_id, {}).values(),
+                SORT_KEYS[(table, order)],
+            ),
+        )
+
+    def keyword_columns(self, client_id: int) -> KeywordColumns:
+        """Return the columnar store of a client's keyword ideas."""
+        return self._keyword_ideas.get(client_id) or KeywordColumns(client_id)
+
+    def filter_keyword_ideas(
+        self,
+        client_id: int,
+        min_sv: int | None = None,
+        max_kd: int | None = None,
+        order: str = "volume",
+    ) -> SortedColumnsView:
+        """Return the ideas matching the metric filters, sorted by ``order``."""
+        columns = self.keyword_columns(client_id)
+        if min_sv is None and max_kd is None:
+            return columns.sorted_view(order)
+        return columns.sorted_view(order, columns.select(min_sv, max_kd))
+
+    # Clients
+    def list_clients(self) -> list[ClientRead]:
+        return list(self._clients.values())
+
+    def get_client(self, client_id: int) -> ClientRead | None:
+        return self._clients.get(client_id)
+
+    def get_client_context(self, client_id: int) -> ClientContextRead | None:
+        return self._client_contexts.get(client_id)
+
+    # Keywords
+    def list_keyword_ideas(self, client_id: int) -> list[KeywordIdeaRead]:
+        return self.keyword_columns(client_id).models()
+
+    def get_keyword_idea(
+        self, client_id: int, keyword_id: int
+    ) -> KeywordIdeaRead | None:
+        return self.keyword_columns(client_id).get(keyword_id)
+
+    def list_keyword_clusters(self, client_id: int) -> list[KeywordClusterRead]:
+        return list(self._rows["keyword_clusters"].get(client_id, {}).values())
+
+    def list_keyword_sets(self, client_id: int) -> list[KeywordSetRead]:
+        return list(self._rows["keyword_sets"].get(client_id, {}).values())
+
+    def get_keyword_set(
+        self, client_id: int, keyword_set_id: int
+    ) -> KeywordSetRead | None:
+        return self._rows["keyword_sets"].get(client_id, {}).get(keyword_set_id)
+
+    def list_best_alternates(self, client_id: int) -> list[BestAlternateRead]:
+        return list(self._rows["best_alternates"].get(client_id, {}).values())
+
+    def get_best_alternate_for_keyword(
+        self, client_id: int, keyword_id: int
+    ) -> BestAlternateRead | None:
+        return self._best_alternates_by_keyword.get((client_id, keyword_id))
+
+    # Blog ideas
+    def list_blog_ideas(self, client_id: int) -> list[BlogIdeaRead]:
+        return list(self._rows["blog_ideas"].get(client_id, {}).values())
+
+    def get_blog_idea(
+        self, client_id: int, blog_idea_id: int
+    ) -> BlogIdeaRead | None:
+        return self._rows["blog_ideas"].get(client_id, {}).get(blog_idea_id)
+
+    # Blog posts
+    def list_blog_post_artifacts(self) -> list[BlogPostArtifactRead]:
+        return list(self._blog_post_artifacts.values())
+
+    def get_blog_post_artifact(
+        self, blog_post_id: int
+    ) -> BlogPostArtifactRead | None:
+        return self._blog_post_artifacts.get(blog_post_id)
+
+    def get_blog_post_artifact_for_idea(
+        self, client_id: int, blog_idea_id: int
+    ) -> BlogPostArtifactRead | None:
+        return self._blog_post_artifacts_by_idea.get((client_id, blog_idea_id))
+
+
+@lru_cache()
+def get_repository() -> Repository:
+    settings = get_settings()
+    store = open_store(settings.DATABASE_PATH, settings.DATABASE_POOL_SIZE)
+    return Repository.from_store(store)
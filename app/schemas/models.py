@@ -1,7 +1,9 @@
 from datetime import datetime
-from typing import Any
+from typing import Any, Generic, Literal, TypeVar
 from pydantic import BaseModel, ConfigDict
 
+T = TypeVar("T")
+
 
 # Client Schemas
 class ClientBase(BaseModel):
@@ -131,6 +133,16 @@ class KeywordIdeaRead(BaseModel):
     created_at: datetime
 
 
+class ScoredKeywordIdeaRead(KeywordIdeaRead):
+    quality: float
+
+
+class KeywordSuggestionRead(BaseModel):
+    keyword: str
+    search_volume: int | None
+    sources: list[str]
+
+
 # KeywordClusterKeyword Schemas
 class KeywordClusterKeywordBase(BaseModel):
     keyword: str
@@ -306,6 +318,24 @@ class BlogIdeaRead(BaseModel):
     updated_at: datetime
 
 
+class StageTimingRead(BaseModel):
+    stage: str
+    seconds: float
+    compute_seconds: float
+
+
+class BlogIdeaJobRead(BaseModel):
+    id: str
+    client_id: int
+    blog_idea_id: int
+    state: str
+    error_message: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+    stages: list[StageTimingRead] = []
+
+
 # BlogPostArtifact Schemas
 class BlogPostArtifactBase(BaseModel):
     title: str
@@ -396,3 +426,24 @@ class HTMLArtifactRead(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+
+# Search Schemas
+class SearchResultRead(BaseModel):
+    type: Literal["blog_idea", "keyword_set", "blog_post"]
+    id: int
+    client_id: int
+    title: str
+    score: float
+
+
+# Delta sync Schemas
+class ChangeSet(BaseModel, Generic[T]):
+    items: list[T]
+    deleted: list[int]
+    cursor: str
+
+
+# Pagination Schemas
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: str | None
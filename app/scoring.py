@@ -0,0 +1,95 @@
+from typing import Sequence
+
+import numpy as np
+
+from app.columns import KeywordColumns
+
+# Search volume that earns the full volume score; the score grows with the
+# log of the volume up to it
+REFERENCE_VOLUME = 100_000
+# Difficulty assumed for keywords without one
+DEFAULT_DIFFICULTY = 50
+# Weight per intent code (1 informational, 2 navigational, 3 commercial,
+# 4 transactional); keywords without an intent are not weighted
+INTENT_WEIGHTS = np.array([1.0, 0.8, 0.7, 1.0, 1.0])
+
+
+def quality_scores(
+    search_volume: np.ndarray,
+    keyword_difficulty: np.ndarray,
+    intent: np.ndarray | None = None,
+) -> np.ndarray:
+    """Score keywords between 0 and 1 by opportunity.
+
+    The score is the log-scaled search volume (1 at ``REFERENCE_VOLUME``)
+    times the ease ``1 - difficulty / 100``, weighted by intent. Missing
+    values are NaN in the float inputs and 0 in ``intent``; a missing
+    volume scores 0 and a missing difficulty counts as
+    ``DEFAULT_DIFFICULTY``.
+    """
+    volume = np.nan_to_num(np.asarray(search_volume, dtype=np.float64), nan=0.0)
+    difficulty = np.nan_to_num(
+        np.asarray(keyword_difficulty, dtype=np.float64), nan=DEFAULT_DIFFICULTY
+    )
+    scores = np.log1p(np.maximum(volume, 0.0)) / np.log1p(REFERENCE_VOLUME)
+    np.minimum(scores, 1.0, out=scores)
+    scores *= 1.0 - np.clip(difficulty, 0.0, 100.0) / 100.0
+    if intent is not None:
+        codes = np.asarray(intent, dtype=np.int64)
+        known = (codes >= 0) & (codes < len(INTENT_WEIGHTS))
+        scores *= INTENT_WEIGHTS[np.where(known, codes, 0)]
+    return scores
+
+
+def _floats(values: Sequence[int | None]) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def score_values(
+    search_volume: Sequence[int | None],
+    keyword_difficulty: Sequence[int | None],
+    intent: Sequence[int | None] | None = None,
+) -> list[float]:
+    """``quality_scores`` over plain values, rounded to 4 decimals."""
+    scores = quality_scores(
+        _floats(search_volume),
+        _floats(keyword_difficulty),
+        None
+        if intent is None
+        else np.array([v or 0 for v in intent], dtype=np.int64),
+    )
+    return [round(float(s), 4) for s in scores]
+
+
+def column_scores(
+    columns: KeywordColumns, positions: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Score the rows at ``positions`` (default: every row) in one pass.
+
+    Returns the positions and their scores.
+    """
+    if positions is None:
+        positions = columns.positions()
+    volume, has_volume, difficulty, has_difficulty = columns.metrics(positions)
+    scores = quality_scores(
+        np.where(has_volume, volume, np.nan),
+        np.where(has_difficulty, difficulty, np.nan),
+    )
+    return positions, scores
+
+
+def top_positions(
+    columns: KeywordColumns, k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the positions and scores of the ``k`` best-scoring rows, best
+    first and ties by id.
+
+    Only the top ``k`` are sorted; the rest of the pool is split off with
+    ``np.argpartition``, which picks among rows tied at the cut.
+    """
+    positions, scores = column_scores(columns)
+    if k < len(positions):
+        keep = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+        positions, scores = positions[keep], scores[keep]
+    order = np.lexsort((columns.ids(positions), -scores))
+    return positions[order], scores[order]
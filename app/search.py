@@ -0,0 +1,225 @@
+import heapq
+import html
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+from pydantic import BaseModel
+
+from app.schemas.models import (
+    BlogIdeaRead,
+    BlogPostArtifactRead,
+    KeywordSetRead,
+    SearchResultRead,
+)
+from app.similarity import keyword_tokens
+
+if TYPE_CHECKING:
+    from app.repository import Repository
+
+# Searchable tables and the result type reported for their rows
+KINDS = {
+    "blog_ideas": "blog_idea",
+    "keyword_sets": "keyword_set",
+    "blog_post_artifacts": "blog_post",
+}
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_TAG_RE = re.compile(r"<[^>]*>")
+
+
+def html_text(markup: str) -> str:
+    """Strip tags and decode entities."""
+    return html.unescape(_TAG_RE.sub(" ", markup))
+
+
+def _document(row: BaseModel) -> tuple[str, str]:
+    """Return the title and the searchable text of a row."""
+    if isinstance(row, BlogIdeaRead):
+        return row.topic, row.topic
+    if isinstance(row, KeywordSetRead):
+        keywords = [row.primary_keyword] + [
+            s["keyword"] for s in row.secondaries or [] if s.get("keyword")
+        ]
+        return row.primary_keyword, " ".join(keywords)
+    if isinstance(row, BlogPostArtifactRead):
+        parts = [
+            row.title,
+            row.meta_title,
+            row.meta_description,
+            row.summary,
+            " ".join(row.meta_keywords or []),
+            html_text(row.html_body),
+        ]
+        return row.title, " ".join(p for p in parts if p)
+    raise TypeError(f"Unsearchable row: {type(row).__name__}")
+
+
+class SearchIndex:
+    """BM25-ranked inverted index over blog ideas, keyword sets and blog
+    posts of every client.
+
+    Each row is one document. The postings map a term to the documents
+    containing it and the term's count there, so a query only touches the
+    postings of its own terms. Documents are added, replaced and removed
+    one by one as rows change.
+    """
+
+    def __init__(self) -> None:
+        # (kind, client_id, row_id) -> document number
+        self._numbers: dict[tuple[str, int, int], int] = {}
+        self._refs: list[tuple[str, int, int] | None] = []
+        self._titles: list[str | None] = []
+        self._lengths: list[int] = []
+        self._terms: list[Counter | None] = []
+        self._free: list[int] = []
+        self._postings: dict[str, dict[int, int]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def update(
+        self,
+        table: str,
+        client_id: int,
+        saved: Iterable[BaseModel],
+        deleted: Iterable[int] = (),
+    ) -> None:
+        """Apply the rows written to and deleted from ``table``."""
+        kind = KINDS[table]
+        for row_id in deleted:
+            self._remove((kind, client_id, row_id))
+        for row in saved:
+            self._add((kind, row.client_id, row.id), *_document(row))
+
+    def remove_client(self, client_id: int) -> None:
+        for ref in [r for r in self._numbers if r[1] == client_id]:
+            self._remove(ref)
+
+    def _add(self, ref: tuple[str, int, int], title: str, text: str) -> None:
+        self._remove(ref)
+        terms = Counter(keyword_tokens(text))
+        length = sum(terms.values())
+        if self._free:
+            number = self._free.pop()
+            self._refs[number] = ref
+            self._titles[number] = title
+            self._lengths[number] = length
+            self._terms[number] = terms
+        else:
+            number = len(self._refs)
+            self._refs.append(ref)
+            self._titles.append(title)
+            self._lengths.append(length)
+            self._terms.append(terms)
+        self._numbers[ref] = number
+        self._total_length += length
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[number] = count
+
+    def _remove(self, ref: tuple[str, int, int]) -> None:
+        number = self._numbers.pop(ref, None)
+        if number is None:
+            return
+        for term in self._terms[number]:
+            postings = self._postings[term]
+            del postings[number]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths[number]
+        self._refs[number] = self._titles[number] = self._terms[number] = None
+        self._lengths[number] = 0
+        self._free.append(number)
+
+    def search(
+        self, query: str, client_id: int | None = None, limit: int = 20
+    ) -> list[SearchResultRead]:
+        """Return up to ``limit`` documents matching any term of ``query``,
+        best BM25 score first, optionally only those of one client."""
+        terms = list(dict.fromkeys(keyword_tokens(query)))
+        n = len(self._numbers)
+        if not terms or not n:
+            return []
+        average = self._total_length / n
+        lengths, refs = self._lengths, self._refs
+        scores: dict[int, float] = {}
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            for number, tf in postings.items():
+                if client_id is not None and refs[number][1] != client_id:
+                    continue
+                norm = K1 * (1.0 - B + B * lengths[number] / average)
+                score = idf * tf * (K1 + 1.0) / (tf + norm)
+                scores[number] = scores.get(number, 0.0) + score
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [
+            SearchResultRead(
+                type=refs[number][0],
+                client_id=refs[number][1],
+                id=refs[number][2],
+                title=self._titles[number],
+                score=round(score, 4),
+            )
+            for number, score in best
+        ]
+
+
+class SearchService:
+    """Builds the ``SearchIndex`` on first use and keeps it current from
+    the repository's row changes."""
+
+    def __init__(self, repo: "Repository") -> None:
+        self.repo = repo
+        self._index: SearchIndex | None = None
+        repo.subscribe_rows(self._on_rows)
+
+    def _on_rows(
+        self,
+        table: str,
+        client_id: int,
+        saved: Sequence[BaseModel],
+        deleted: Sequence[int] | None,
+    ) -> None:
+        if self._index is None:
+            return
+        if deleted is None:
+            if table == "clients":
+                self._index.remove_client(client_id)
+        elif table in KINDS:
+            self._index.update(table, client_id, saved, deleted)
+
+    @property
+    def index(self) -> SearchIndex:
+        if self._index is None:
+            index = SearchIndex()
+            for client in self.repo.list_clients():
+                for table, rows in (
+                    ("blog_ideas", self.repo.list_blog_ideas(client.id)),
+                    ("keyword_sets", self.repo.list_keyword_sets(client.id)),
+                ):
+                    index.update(table, client.id, rows)
+            for artifact in self.repo.list_blog_post_artifacts():
+                index.update("blog_post_artifacts", artifact.client_id, [artifact])
+            self._index = index
+        return self._index
+
+    def search(
+        self, query: str, client_id: int | None = None, limit: int = 20
+    ) -> list[SearchResultRead]:
+        return self.index.search(query, client_id, limit)
+
+
+@lru_cache()
+def get_search_service() -> SearchService:
+    from app.repository import get_repository
+
+    return SearchService(get_repository())
@@ -0,0 +1,224 @@
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Sequence
+
+import numpy as np
+
+from app.schemas.models import KeywordIdeaRead
+
+if TYPE_CHECKING:
+    from app.columns import KeywordColumns
+    from app.repository import Repository
+
+DEFAULT_SIM_THRESHOLD = 0.35
+DEFAULT_LIMIT_PER_SEED = 10
+
+NGRAM_SIZE = 3
+# Upper bound on the seeds x keywords score matrix built in one pass
+_MAX_BATCH_CELLS = 4_000_000
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def keyword_tokens(keyword: str) -> list[str]:
+    return _TOKEN_RE.findall(keyword.lower())
+
+
+def token_features(token: str) -> list[str]:
+    """Return a word token and its padded character trigrams."""
+    padded = f" {token} "
+    return [f"w:{token}"] + [
+        padded[i : i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)
+    ]
+
+
+def keyword_features(keyword: str) -> list[str]:
+    """Return the word tokens and padded character trigrams of a keyword."""
+    features = []
+    for token in keyword_tokens(keyword):
+        features += token_features(token)
+    return features
+
+
+def opportunity(ideas: Sequence[KeywordIdeaRead]) -> np.ndarray:
+    """Search volume per point of difficulty; missing values count as 0."""
+    sv = np.fromiter((k.search_volume or 0 for k in ideas), np.float64, len(ideas))
+    kd = np.fromiter(
+        (k.keyword_difficulty or 0 for k in ideas), np.float64, len(ideas)
+    )
+    return sv / (kd + 1.0)
+
+
+def expand_ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenate ``arange(s, e)`` for every pair without a Python loop."""
+    lengths = ends - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(int(lengths.sum()))
+
+
+def pick_best_alternate(
+    seed: KeywordIdeaRead, candidates: Sequence[KeywordIdeaRead]
+) -> KeywordIdeaRead:
+    """Return the candidate with the best opportunity, or ``seed`` itself
+    if none beats it. Ties go to the earliest candidate."""
+    if candidates:
+        scores = opportunity([seed, *candidates])
+        best = int(np.argmax(scores[1:])) + 1
+        if scores[best] > scores[0]:
+            return candidates[best - 1]
+    return seed
+
+
+@dataclass
+class Match:
+    keyword_id: int
+    similarity: float
+
+
+class SimilarityIndex:
+    """TF-IDF vectors of a keyword pool, stored as inverted postings.
+
+    Each keyword is a sparse, L2-normalised vector over word tokens and
+    character trigrams. The postings hold, per feature, the keywords that
+    contain it and their weights, so the cosine similarity of a batch of
+    seeds against the whole pool is a single gather plus ``np.bincount``
+    over the postings of the seeds' features.
+
+    It is built from plain columns (see ``column_snapshot``) and keeps only
+    ids and arrays, no models.
+    """
+
+    def __init__(
+        self,
+        keyword_ids: np.ndarray,
+        keywords: Sequence[str],
+        search_volume: np.ndarray,
+        keyword_difficulty: np.ndarray,
+    ) -> None:
+        self.ids = np.asarray(keyword_ids, dtype=np.int64)
+        self.positions = {k: i for i, k in enumerate(self.ids.tolist())}
+        n = len(self.ids)
+
+        vocabulary: dict[str, int] = {}
+        rows: list[int] = []
+        cols: list[int] = []
+        for i, keyword in enumerate(keywords):
+            for feature in keyword_features(keyword):
+                rows.append(i)
+                cols.append(vocabulary.setdefault(feature, len(vocabulary)))
+        n_features = len(vocabulary)
+        rows_a = np.asarray(rows, dtype=np.int64)
+        cols_a = np.asarray(cols, dtype=np.int64)
+
+        # Term counts per (keyword, feature), sorted by keyword then feature
+        width = max(n_features, 1)
+        cells, tf = np.unique(rows_a * width + cols_a, return_counts=True)
+        rows_a = cells // width
+        cols_a = cells % width
+        df = np.bincount(cols_a, minlength=n_features)
+        idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+        weights = (1.0 + np.log(tf)) * idf[cols_a]
+        norms = np.sqrt(np.bincount(rows_a, weights=weights**2, minlength=n))
+        weights /= norms[rows_a]
+
+        # Row-major (per keyword) layout, for looking up a seed's vector
+        self._row_ptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(rows_a, minlength=n)))
+        )
+        self._row_features = cols_a
+        self._row_weights = weights
+        # Column-major (per feature) layout: the postings
+        order = np.argsort(cols_a, kind="stable")
+        self._post_ptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(cols_a, minlength=n_features)))
+        )
+        self._post_rows = rows_a[order]
+        self._post_weights = weights[order]
+
+        # Missing metrics are stored as 0, as ``opportunity`` counts them
+        self._opportunity = search_volume / (keyword_difficulty + 1.0)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _scores(self, seeds: np.ndarray) -> np.ndarray:
+        """Return the (len(seeds), len(pool)) cosine similarity matrix."""
+        n = len(self.ids)
+        starts, ends = self._row_ptr[seeds], self._row_ptr[seeds + 1]
+        entries = expand_ranges(starts, ends)
+        seed_of_entry = np.repeat(np.arange(len(seeds)), ends - starts)
+        features = self._row_features[entries]
+        seed_weights = self._row_weights[entries]
+
+        # Gather the postings of every (seed, feature) pair in one go
+        post_starts = self._post_ptr[features]
+        post_ends = self._post_ptr[features + 1]
+        lengths = post_ends - post_starts
+        postings = expand_ranges(post_starts, post_ends)
+        cells = np.repeat(seed_of_entry, lengths) * n + self._post_rows[postings]
+        values = np.repeat(seed_weights, lengths) * self._post_weights[postings]
+        scores = np.bincount(cells, weights=values, minlength=len(seeds) * n)
+        return scores.reshape(len(seeds), n)
+
+    def similar(
+        self,
+        keyword_ids: Sequence[int],
+        sim_threshold: float = DEFAULT_SIM_THRESHOLD,
+        limit: int = DEFAULT_LIMIT_PER_SEED,
+    ) -> dict[int, list[Match]]:
+        """Return, per seed id, up to ``limit`` other keyword ids with cosine
+        similarity of at least ``sim_threshold``, best opportunity first.
+
+        Seeds that are not in the pool are left out of the result.
+        """
+        seeds = np.asarray(
+            [self.positions[k] for k in keyword_ids if k in self.positions],
+            dtype=np.int64,
+        )
+        results: dict[int, list[Match]] = {}
+        if not len(seeds) or limit <= 0:
+            return {int(self.ids[s]): [] for s in seeds}
+
+        batch = max(1, _MAX_BATCH_CELLS // max(len(self.ids), 1))
+        for start in range(0, len(seeds), batch):
+            chunk = seeds[start : start + batch]
+            scores = self._scores(chunk)
+            scores[np.arange(len(chunk)), chunk] = -1.0
+            for seed, row in zip(chunk, scores):
+                candidates = np.flatnonzero(row >= sim_threshold)
+                if len(candidates) > limit:
+                    top = np.argpartition(-row[candidates], limit - 1)[:limit]
+                    candidates = candidates[top]
+                # Rank by opportunity, then by similarity
+                ranked = candidates[
+                    np.lexsort((-row[candidates], -self._opportunity[candidates]))
+                ]
+                results[int(self.ids[seed])] = [
+                    Match(int(self.ids[i]), float(row[i])) for i in ranked
+                ]
+        return results
+
+
+def column_snapshot(
+    columns: "KeywordColumns",
+) -> tuple[np.ndarray, list[str], np.ndarray, np.ndarray]:
+    """Copy the ids, keywords, search volumes and difficulties of the live
+    rows, for building a ``SimilarityIndex`` away from the columns."""
+    positions = columns.positions()
+    volume, _, difficulty, _ = columns.metrics(positions)
+    return columns.ids(positions), columns.keywords(positions), volume, difficulty
+
+
+async def get_similarity_index(repo: "Repository", client_id: int) -> SimilarityIndex:
+    """Return the similarity index over a client's keyword ideas.
+
+    The index is cached by the repository until the client's keyword ideas
+    change; (re)building it runs on a worker thread.
+    """
+    return await repo.aderived_index(
+        "similarity",
+        "keyword_ideas",
+        client_id,
+        lambda: column_snapshot(repo.keyword_columns(client_id)),
+        lambda snapshot: SimilarityIndex(*snapshot),
+    )
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StageTiming:
+    stage: str
+    # Wall time seen by the caller, including the trip to the worker
+    seconds: float
+    # Time spent running the stage inside the worker process
+    compute_seconds: float
+
+
+def _noop() -> None:
+    pass
+
+
+def _timed(fn: Callable, args: tuple) -> tuple[Any, float]:
+    """Run ``fn(*args)`` in the worker and time it there."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class StageRunner:
+    """Runs CPU-bound pipeline stages in a pool of worker processes, so
+    they do not block the event loop.
+
+    Stage functions must be module-level (they are pickled by reference)
+    and should take and return flat values: ``str`` and ``bytes`` are
+    copied to the worker as a single buffer, while nested dicts and lists
+    are pickled object by object. Workers are spawned rather than forked,
+    since the server process runs threads.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def start(self) -> None:
+        """Spawn the workers now, so the first stages do not wait for
+        interpreters to start up."""
+        pool = self._pool()
+        for _ in range(self.workers):
+            pool.submit(_noop)
+
+    async def run(
+        self, stage: str, fn: Callable, *args: Any
+    ) -> tuple[Any, StageTiming]:
+        """Run one stage in a worker; return its result and timing.
+
+        If a worker dies, the pool is replaced and the stage is tried once
+        more; a second failure is raised, failing only this stage's job.
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        for attempt in range(2):
+            pool = self._pool()
+            try:
+                result, compute = await loop.run_in_executor(
+                    pool, _timed, fn, args
+                )
+                break
+            except BrokenProcessPool:
+                logger.warning("Stage %s lost its worker pool", stage)
+                self._discard(pool)
+                if attempt:
+                    raise
+        timing = StageTiming(stage, time.perf_counter() - start, compute)
+        logger.info(
+            "Stage %s took %.3fs (%.3fs in worker)",
+            stage,
+            timing.seconds,
+            timing.compute_seconds,
+        )
+        return result, timing
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        """Shut down a broken pool; the next stage starts a new one, unless
+        another stage already has."""
+        if self._executor is pool:
+            self._executor = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+@lru_cache()
+def get_stage_runner() -> StageRunner:
+    workers = get_settings().PIPELINE_WORKERS or os.cpu_count() or 1
+    return StageRunner(workers)
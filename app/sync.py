@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.repository import get_repository
+from app.responses import not_modified_response
+from app.schemas.models import ChangeSet
+
+
+async def changes_json_response(
+    request: Request,
+    table: str,
+    client_id: int,
+    since: datetime,
+    model: type[BaseModel],
+) -> Response:
+    """Serve the rows of ``table`` that changed after ``since``.
+
+    The body is a ``ChangeSet``: rows written since the cursor, ids of rows
+    deleted since the cursor, and the cursor to pass as the next ``since``.
+    The query runs on a worker thread against the ``updated_at`` index.
+    """
+    repo = get_repository()
+    etag = repo.etag((table, client_id))
+    not_modified = not_modified_response(request.headers, etag)
+    if not_modified:
+        return not_modified
+
+    items, deleted, cursor = await repo.store.achanges_since(table, client_id, since)
+    body = ChangeSet[model](items=items, deleted=deleted, cursor=cursor)
+    return Response(
+        content=body.model_dump_json(),
+        media_type="application/json",
+        headers={"ETag": etag},
+    )
@@ -1,7 +1,7 @@
 import asyncio
 import json
 from datetime import datetime, timezone
-from typing import AsyncGenerator
+from typing import AsyncGenerator, AsyncIterable
 
 
 async def delay_response(seconds: int = 5):
@@ -13,6 +13,7 @@ async def create_sse_stream(
     progress_messages: list[str],
     final_data: dict,
     delay_per_message: float = 1.0,
+    batches: AsyncIterable[list] | None = None,
 ) -> AsyncGenerator[str, None]:
     """
     Create an SSE stream with progress messages and final data.
@@ -21,6 +22,8 @@ async def create_sse_stream(
         progress_messages: List of progress messages to send
         final_data: Final data to send in completion event
         delay_per_message: Delay between messages in seconds
+        batches: Optional items to send after the progress messages, one
+            ``batch`` event per list, before the completion event
     """
     step = 0
     
@@ -35,6 +38,18 @@ async def create_sse_stream(
         yield f"data: {event_data}\n\n"
         await asyncio.sleep(delay_per_message)
     
+    # Send batches as they are produced, so only one is held at a time
+    if batches is not None:
+        number = 0
+        async for batch in batches:
+            number += 1
+            event_data = json.dumps({
+                "type": "batch",
+                "batch": number,
+                "data": batch,
+            })
+            yield f"data: {event_data}\n\n"
+    
     # Send final completion event
     final_event = json.dumps({
         "type": "complete",
@@ -43,6 +58,15 @@ async def create_sse_stream(
     yield f"data: {final_event}\n\n"
 
 
+async def create_ndjson_stream(
+    batches: AsyncIterable[list],
+) -> AsyncGenerator[str, None]:
+    """Stream items as newline-delimited JSON, one chunk per batch."""
+    async for batch in batches:
+        if batch:
+            yield "".join(json.dumps(item) + "\n" for item in batch)
+
+
 def get_current_timestamp() -> datetime:
     """Get current UTC timestamp."""
     return datetime.now(timezone.utc)